@@ -0,0 +1,72 @@
+import os
+
+import numpy as np
+
+from ttlCache import TTLCache, normalize_question
+
+#Cache de respostas do tutor na frente do chat.send_message. A chave exata é a
+#pergunta normalizada + o escopo (ids de persona/instrução, coleção); o caminho
+#semântico compara o embedding da pergunta (o mesmo usado na busca do RAG) com os
+#das perguntas já respondidas no mesmo escopo
+class AnswerCache():
+    #similarity: cosseno mínimo para reaproveitar a resposta de uma pergunta parecida
+    #(None desliga o caminho semântico)
+    def __init__(self, max_entries=1024, ttl=None, similarity=None):
+        ttl = ttl if ttl is not None else float(os.getenv("ANSWER_CACHE_TTL", "86400"))
+        if similarity is None:
+            similarity = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95")) or None
+        self.entries = TTLCache(max_entries=max_entries, ttl=ttl)
+        self.similarity = similarity
+        self.stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0}
+
+    @staticmethod
+    def make_key(question, scope):
+        return (tuple(scope), normalize_question(question))
+
+    @staticmethod
+    def _unit(vector):
+        vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    #embed é chamado só se a busca exata falhar; devolve (resposta ou None, vetor calculado
+    #ou None) para o chamador reaproveitar o embedding na busca dos chunks
+    def get(self, question, scope, embed=None):
+        item = self.entries.get(self.make_key(question, scope))
+        if item is not None:
+            self.stats["exact_hits"] += 1
+            return item[0], None
+
+        vector = embed() if embed is not None else None
+        if vector is not None and self.similarity:
+            answer = self._get_similar(self._unit(vector), tuple(scope))
+            if answer is not None:
+                self.stats["semantic_hits"] += 1
+                return answer, vector
+
+        self.stats["misses"] += 1
+        return None, vector
+
+    def _get_similar(self, unit, scope):
+        candidates = [(k, v) for k, v in self.entries.items() if k[0] == scope and v[1] is not None]
+        if not candidates:
+            return None
+        scores = np.stack([v[1] for _, v in candidates]) @ unit
+        best = int(np.argmax(scores))
+        if scores[best] < self.similarity:
+            return None
+        key, (answer, _) = candidates[best]
+        self.entries.get(key)
+        return answer
+
+    def put(self, question, scope, answer, vector=None):
+        unit = self._unit(vector) if vector is not None else None
+        self.entries.put(self.make_key(question, scope), (answer, unit))
+
+    def clear(self):
+        self.entries.clear()
+
+    def info(self):
+        lookups = sum(self.stats.values())
+        hits = self.stats["exact_hits"] + self.stats["semantic_hits"]
+        return dict(self.stats, size=len(self.entries), hit_rate=hits / lookups if lookups else 0.0)
@@ -1,17 +1,123 @@
-from flask import Flask, request
+import asyncio
+import os
+import threading
+from flask import Flask, Response, jsonify, request, stream_with_context
 from flask_cors import CORS
 from menu import Menu
+from answerCache import AnswerCache
+from llmGate import LLMBusy, LLMGate
+from sessionRegistry import SessionRegistry
+from streaming import StreamStats, StreamTiming, sse_event
 
-chat = Menu()
-app = Flask(__name__)
-CORS(app)
+try:
+    from asgiref.wsgi import WsgiToAsgi
+except Exception:
+    WsgiToAsgi = None
 
-@app.route('/input', methods=['POST'])
-def add_message():
-    new_message = request.get_json()
-    output = chat.post_message_norag(new_message)
+#Fábrica padrão: cliente do LLM, cache de respostas e RAG compartilhados, criados na
+#primeira sessão; cada sessão ganha o seu próprio chat
+def default_menu_factory(gate, client=None):
+    shared = {}
+    lock = threading.Lock()
 
-    return output
+    def factory():
+        with lock:
+            if not shared:
+                from ragGenerate import RagGenerate
+                shared["client"] = client if client is not None else Menu.make_client()
+                shared["answers"] = AnswerCache()
+                shared["recovery"] = RagGenerate()
+        return Menu(client=shared["client"], answers=shared["answers"], recovery=shared["recovery"], gate=gate)
 
-app.run(port=3000, host='localhost', debug=True)
-    
\ No newline at end of file
+    return factory
+
+
+#Corpo aceito: a pergunta como string JSON (formato original) ou
+#{"message": ..., "session_id": ..., "rag": true|false}
+def parse_message(payload):
+    if isinstance(payload, dict):
+        return payload.get("message", ""), payload.get("session_id"), bool(payload.get("rag", False))
+    return payload, None, False
+
+
+def create_app(menu_factory=None, max_concurrency=None, max_queue=None, idle_ttl=None, client=None):
+    gate = LLMGate(
+        max_concurrency=max_concurrency or int(os.getenv("LLM_MAX_CONCURRENCY", "4")),
+        max_queue=max_queue or int(os.getenv("LLM_MAX_QUEUE", "64")),
+    )
+    sessions = SessionRegistry(
+        menu_factory(gate) if menu_factory is not None else default_menu_factory(gate, client),
+        idle_ttl=idle_ttl or float(os.getenv("SESSION_IDLE_TTL", "1800")),
+    )
+
+    app = Flask(__name__)
+    CORS(app, expose_headers=["X-Session-Id", "X-Prompt-Tokens"])
+    app.config["llm_gate"] = gate
+    app.config["sessions"] = sessions
+    stream_stats = StreamStats()
+
+    def answer(session, message, rag):
+        with session.lock:
+            if rag:
+                output = session.menu.post_message_rag(message)
+            else:
+                output = session.menu.post_message_norag(message)
+            return output, session.menu.last_prompt_stats
+
+    @app.route('/input', methods=['POST'])
+    async def add_message():
+        message, session_id, rag = parse_message(request.get_json())
+        session_id = session_id or request.headers.get("X-Session-Id")
+        session = sessions.get(session_id)
+        try:
+            output, prompt_stats = await asyncio.to_thread(answer, session, message, rag)
+        except LLMBusy:
+            return jsonify({"error": "tutor ocupado, tente novamente"}), 503, {"Retry-After": "1"}
+
+        headers = {"X-Session-Id": session.session_id}
+        if prompt_stats:
+            headers["X-Prompt-Tokens"] = str(prompt_stats["prompt_tokens"])
+        return output, 200, headers
+
+    #Server-Sent Events: um evento por pedaço de texto ({"text": ...}) e, no fim, um
+    #evento "done" com o TTFT e o tempo total medidos no servidor
+    @app.route('/input/stream', methods=['POST'])
+    def add_message_stream():
+        message, session_id, rag = parse_message(request.get_json())
+        session = sessions.get(session_id or request.headers.get("X-Session-Id"))
+
+        def events():
+            timing = StreamTiming()
+            with session.lock:
+                stream = session.menu.stream_message_rag if rag else session.menu.stream_message_norag
+                try:
+                    for text in stream(message, timing):
+                        yield sse_event({"text": text})
+                except LLMBusy:
+                    yield sse_event({"error": "tutor ocupado, tente novamente"}, event="error")
+                    return
+            stream_stats.record(timing)
+            yield sse_event(dict(timing.info(), session_id=session.session_id,
+                                 prompt=session.menu.last_prompt_stats), event="done")
+
+        headers = {"X-Session-Id": session.session_id, "Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        return Response(stream_with_context(events()), mimetype="text/event-stream", headers=headers)
+
+    @app.route('/session/<session_id>', methods=['DELETE'])
+    def end_session(session_id):
+        return ("", 204) if sessions.drop(session_id) else ("", 404)
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        sessions.evict_idle()
+        return jsonify({"llm": gate.info(), "sessions": sessions.info(), "streaming": stream_stats.info()})
+
+    return app
+
+
+app = create_app()
+#Para servir com um servidor ASGI: uvicorn api:asgi_app --workers 1
+asgi_app = WsgiToAsgi(app) if WsgiToAsgi is not None else None
+
+if __name__ == "__main__":
+    app.run(port=3000, host='localhost', debug=True, threaded=True)
@@ -0,0 +1,81 @@
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from answerCache import AnswerCache
+from api import create_app
+from llmStub import StubLLMClient
+from menu import Menu
+
+# Teste de carga da API com um LLM falso (llmStub.py): N alunos simultâneos, cada um
+# com a sua sessão, mandando perguntas para /input. Mede latência, vazão, fila
+# do LLM e se alguma resposta foi parar na sessão errada.
+
+
+def run(args, max_concurrency):
+    client = StubLLMClient(latency=args.latency, per_token_latency=args.token_latency)
+
+    def menu_factory(gate):
+        answers = AnswerCache(similarity=0)
+        return lambda: Menu(client=client, answers=answers, recovery=object(), gate=gate)
+
+    app = create_app(menu_factory=menu_factory, max_concurrency=max_concurrency, max_queue=args.students * 2)
+
+    def student(i):
+        http = app.test_client()
+        session_id = None
+        latencies = []
+        first_chunks = []
+        for j in range(args.questions):
+            headers = {"X-Session-Id": session_id} if session_id else {}
+            t0 = time.perf_counter()
+            if args.stream:
+                response = http.post("/input/stream", json=f"aluno {i} pergunta {j}", headers=headers, buffered=False)
+                for _ in response.response:
+                    if len(first_chunks) == j:
+                        first_chunks.append(time.perf_counter() - t0)
+            else:
+                response = http.post("/input", json=f"aluno {i} pergunta {j}", headers=headers)
+            latencies.append(time.perf_counter() - t0)
+            session_id = response.headers["X-Session-Id"]
+        return session_id, latencies, first_chunks
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.students) as executor:
+        results = list(executor.map(student, range(args.students)))
+    elapsed = time.perf_counter() - t0
+
+    sessions = app.config["sessions"]
+    histories = [sessions.get(sid).menu.chat.turn_count for sid, _, _ in results]
+    latencies = sorted(l for _, ls, _ in results for l in ls)
+    metrics = app.test_client().get("/metrics").get_json()
+    print(f"Limite de {max_concurrency} chamadas simultâneas ao LLM:")
+    print(f"  {len(latencies) / elapsed:.1f} req/s, p50 {statistics.median(latencies) * 1000:.0f} ms, "
+          f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:.0f} ms")
+    if args.stream:
+        firsts = sorted(f for _, _, fs in results for f in fs)
+        print(f"  primeiro pedaço: p50 {statistics.median(firsts) * 1000:.0f} ms, "
+              f"p95 {firsts[int(len(firsts) * 0.95) - 1] * 1000:.0f} ms")
+    print(f"  fila máxima {metrics['llm']['max_waiting']}, espera média {metrics['llm']['avg_wait_ms']:.0f} ms, "
+          f"pico no LLM {client.peak_active}, recusadas {metrics['llm']['rejected']}")
+    print(f"  sessões {metrics['sessions']['active']}, turnos por sessão {min(histories)}..{max(histories)} "
+          f"(esperado {args.questions})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga da API com LLM simulado.")
+    parser.add_argument("--students", type=int, default=32)
+    parser.add_argument("--questions", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.2, help="Latência simulada do LLM (s).")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Latência simulada por token (s).")
+    parser.add_argument("--stream", action="store_true", help="Usa /input/stream e mede o primeiro pedaço.")
+    parser.add_argument("--limits", default="1,4,16", help="Limites de concorrência a comparar.")
+    args = parser.parse_args()
+
+    for limit in [int(x) for x in args.limits.split(",")]:
+        run(args, limit)
+
+
+if __name__ == "__main__":
+    main()
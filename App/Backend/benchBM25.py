@@ -0,0 +1,110 @@
+import argparse
+import json
+import random
+import tempfile
+import time
+
+import numpy as np
+
+from bm25Index import BM25Index, tokenize
+from embedBackend import get_backend
+from hybridSearch import HybridRetriever
+from vectorIndex import LocalVectorStore
+
+# Latência e recall@k: busca vetorial, BM25 e híbrida (RRF). As perguntas repetem
+# um termo raro de um chunk (nome de fármaco, núcleo, sigla) e algumas palavras
+# comuns dele; os chunks corretos são os que contêm o termo raro.
+
+COMMON = ("neurônio sinapse potencial ação membrana receptor canal íon sódio potássio cálcio "
+          "córtex memória aprendizagem dopamina serotonina glutamato plasticidade axônio dendrito "
+          "neurotransmissor vesícula liberação excitatório inibitório circuito via motor sensorial").split()
+
+
+def synthetic_corpus(n, rng):
+    rare = [f"{p}{i}" for i, p in enumerate(["halofenazina", "nucleo-x", "TRPV", "clozaprida", "GABRA"] * (n // 5 + 1))][:n]
+    docs = []
+    for i in range(n):
+        words = [rng.choice(COMMON) for _ in range(80)]
+        words.insert(rng.randrange(len(words)), rare[rng.randrange(len(rare))])
+        docs.append(" ".join(words) + ".")
+    return docs
+
+
+def load_documents(jsonl, limit):
+    with open(jsonl, "r", encoding="utf-8") as f:
+        return [json.loads(line)["text"] for line in f if line.strip()][:limit]
+
+
+def make_queries(documents, index, count, rng):
+    df = {t: index.offsets[i + 1] - index.offsets[i] for t, i in index.vocab.items()}
+    queries = []
+    for row in rng.sample(range(len(documents)), min(count, len(documents))):
+        words = [w for w in documents[row].split() if tokenize(w)]
+        if len(words) < 4:
+            continue
+        rare = min(words, key=lambda w: df.get(tokenize(w)[0], 1 << 30))
+        term = tokenize(rare)[0]
+        t = index.vocab[term]
+        truth = set(index.postings_docs[index.offsets[t]:index.offsets[t + 1]].tolist())
+        queries.append((f"qual a relação de {rare} com " + " ".join(rng.sample(words, 3)), truth))
+    return queries
+
+
+def recall(rows, truth, k):
+    return len(set(rows[:k]) & truth) / min(k, len(truth))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de recall/latência: vetorial x BM25 x híbrida.")
+    parser.add_argument("--jsonl", default=None, help="JSONL do extractorPDF (sem ele, corpus sintético).")
+    parser.add_argument("--n", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--candidates", type=int, default=8)
+    parser.add_argument("--backend", default="hashing", choices=["hashing", "local", "remote"])
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    documents = load_documents(args.jsonl, args.n) if args.jsonl else synthetic_corpus(args.n, rng)
+    ids = [str(i) for i in range(len(documents))]
+
+    t0 = time.perf_counter()
+    index = BM25Index.build(documents, ids=ids)
+    build = time.perf_counter() - t0
+    postings_mb = (index.postings_docs.nbytes + index.postings_tfs.nbytes + index.offsets.nbytes) / 1e6
+    print(f"BM25: {len(documents)} chunks, {len(index.vocab)} termos, construído em {build:.2f}s, postings {postings_mb:.1f} MB")
+
+    backend = get_backend(args.backend)
+    vectors = np.asarray(backend(documents, 'search_document'), dtype=np.float32)
+    queries = make_queries(documents, index, args.queries, rng)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = LocalVectorStore(tmp + "/vec")
+        store.create_collection("bench", vectors, documents, ids=ids)
+        index.save(tmp + "/bm25/bench")
+        hybrid = HybridRetriever(store, base_dir=tmp + "/bm25", candidates=args.candidates)
+        hybrid.lexical_index("bench")
+
+        results = {"vetorial": [], "BM25": [], "híbrida": []}
+        times = {name: 0.0 for name in results}
+        for question, truth in queries:
+            query = backend([question], 'search_query')
+            t0 = time.perf_counter()
+            dense = store.collection_query(query, "bench", k=args.k)["ids"][0]
+            times["vetorial"] += time.perf_counter() - t0
+            t0 = time.perf_counter()
+            lexical = index.query(question, k=args.k)["ids"][0]
+            times["BM25"] += time.perf_counter() - t0
+            t0 = time.perf_counter()
+            fused = hybrid.collection_query(query, "bench", k=args.k, question=question)["ids"][0]
+            times["híbrida"] += time.perf_counter() - t0
+            for name, got in (("vetorial", dense), ("BM25", lexical), ("híbrida", fused)):
+                results[name].append(recall([int(x) for x in got], truth, args.k))
+
+    print(f"{len(queries)} perguntas, k={args.k}, híbrida com {args.candidates} candidatos de cada lado")
+    for name in results:
+        print(f"  {name:<9} recall@{args.k}={np.mean(results[name]):.3f}  {times[name] / len(queries) * 1000:.2f} ms/pergunta")
+
+
+if __name__ == "__main__":
+    main()
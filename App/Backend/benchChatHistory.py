@@ -0,0 +1,57 @@
+import argparse
+
+from chatHistory import CompactChat
+from instructions import Instructions
+from llmStub import StubLLMClient
+from promptBuilder import PromptBuilder, estimate_tokens
+
+# Tamanho da requisição ao LLM por turno em uma sessão longa de exercícios
+# (instrução "02"): histórico completo do chat x janela deslizante + resumo.
+# LLM simulado (llmStub.py); tokens estimados como no promptBuilder.
+
+
+def context_for(turn, chunks, chunk_chars):
+    base = f"Trecho {turn} sobre potencial de ação, sinapses e neurotransmissores. "
+    return [(base * (chunk_chars // len(base) + 1))[:chunk_chars] + f" [{turn}.{i}]" for i in range(chunks)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do tamanho do prompt com histórico limitado.")
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--window", type=int, default=6)
+    parser.add_argument("--chunks", type=int, default=4)
+    parser.add_argument("--chunk-chars", type=int, default=500)
+    parser.add_argument("--answer-tokens", type=int, default=150)
+    parser.add_argument("--every", type=int, default=5)
+    args = parser.parse_args()
+
+    instructions = Instructions()
+    system_text = instructions.get_instructions("04") + "\n" + instructions.get_instructions("02")
+    client = StubLLMClient(latency=0.0, tokens=args.answer_tokens)
+
+    full_chat = client.chats.create(model="stub")
+    full_prompts = PromptBuilder(system_text, budget=100_000)
+    compact_chat = CompactChat(client, model="stub", system_text=system_text, window=args.window)
+    compact_prompts = PromptBuilder("", budget=100_000)
+
+    print(f"{'turno':>5} {'histórico completo':>20} {'janela + resumo':>17}")
+    for turn in range(1, args.turns + 1):
+        question = f"Monte mais um exercício sobre o tema {turn}, por favor."
+        documents = context_for(turn, args.chunks, args.chunk_chars)
+
+        message = full_prompts.build(question, documents)
+        full_tokens = sum(estimate_tokens(text) for _, text in full_chat.history) + estimate_tokens(message)
+        full_chat.send_message(message)
+        full_prompts.mark_sent()
+
+        compact_chat.send_message(compact_prompts.build(question, documents), f"Pergunta: {question}")
+        compact_tokens = compact_chat.last_stats["request_tokens"]
+
+        if turn == 1 or turn % args.every == 0:
+            print(f"{turn:>5} {full_tokens:>20} {compact_tokens:>17}")
+
+    print(f"Resumos gerados: {compact_chat.summaries} (chamadas extras ao LLM), janela de {args.window} trocas")
+
+
+if __name__ == "__main__":
+    main()
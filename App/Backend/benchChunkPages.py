@@ -0,0 +1,113 @@
+import argparse
+import time
+
+from pathlib import Path
+from typing import List
+
+from extractorPDF import (
+    clean_and_format_pages,
+    extract_text_pages,
+    make_chunks,
+    page_for_offset,
+)
+
+# Compara o mapeamento chunk -> página antigo (full_text.find + varredura linear
+# de page_offsets) com o novo (spans devolvidos por make_chunks + bisect).
+
+
+def legacy_page_ranges(pages: List[str], max_chars: int, min_chars: int, overlap: int):
+    page_offsets = []
+    buf = []
+    total = 0
+    for i, p in enumerate(pages, start=1):
+        page_offsets.append((i, total, total + len(p)))
+        buf.append(p)
+        total += len(p) + 2
+    full_text = "\n\n".join(buf).strip()
+
+    chunk_texts = make_chunks(full_text, max_chars=max_chars, min_chars=min_chars, overlap=overlap)
+
+    def page_range_for_span(start_idx: int, end_idx: int):
+        start_page = 1
+        end_page = len(pages)
+        for (pg, a, b) in page_offsets:
+            if a <= start_idx <= b:
+                start_page = pg
+                break
+        for (pg, a, b) in page_offsets:
+            if a <= end_idx <= b:
+                end_page = pg
+                break
+        return start_page, end_page
+
+    out = []
+    cursor = 0
+    for c in chunk_texts:
+        pos = full_text.find(c, cursor)
+        if pos == -1:
+            pos = full_text.find(c)
+        if pos == -1:
+            out.append((c, 1, len(pages), False))
+        else:
+            pf, pt = page_range_for_span(pos, pos + len(c))
+            cursor = pos + len(c)
+            out.append((c, pf, pt, True))
+    return out
+
+
+def span_page_ranges(pages: List[str], max_chars: int, min_chars: int, overlap: int):
+    page_starts = []
+    total = 0
+    for p in pages:
+        page_starts.append(total)
+        total += len(p) + 2
+    full_text = "\n\n".join(pages)
+
+    spans = make_chunks(full_text, max_chars=max_chars, min_chars=min_chars, overlap=overlap, with_spans=True)
+    return [
+        (c, page_for_offset(page_starts, a), page_for_offset(page_starts, b - 1))
+        for c, a, b in spans
+    ]
+
+
+def timed(fn, repeat: int):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do mapeamento chunk -> página (antigo x spans + bisect).")
+    parser.add_argument("--pdf", default="files/Conteudo_Completo.pdf", help="PDF usado no benchmark.")
+    parser.add_argument("--copies", type=int, default=10, help="Quantas vezes repetir as páginas para simular um livro longo.")
+    parser.add_argument("--repeat", type=int, default=3, help="Execuções por método (vale a melhor).")
+    parser.add_argument("--max-chars", type=int, default=1200)
+    parser.add_argument("--min-chars", type=int, default=400)
+    parser.add_argument("--overlap", type=int, default=150)
+    args = parser.parse_args()
+
+    pages = clean_and_format_pages(extract_text_pages(Path(args.pdf)))
+    pages = pages * max(1, args.copies)
+    params = (args.max_chars, args.min_chars, args.overlap)
+
+    t_old, old = timed(lambda: legacy_page_ranges(pages, *params), args.repeat)
+    t_new, new = timed(lambda: span_page_ranges(pages, *params), args.repeat)
+
+    same_text = len(old) == len(new) and all(o[0] == n[0] for o, n in zip(old, new))
+    located = [(o, n) for o, n in zip(old, new) if o[3]]
+    same_pages = sum(1 for o, n in located if (o[1], o[2]) == (n[1], n[2]))
+
+    print(f"Páginas: {len(pages)} | Chunks: {len(new)}")
+    print(f"Antigo (find + varredura): {t_old * 1000:.1f} ms")
+    print(f"Novo (spans + bisect):     {t_new * 1000:.1f} ms  ({t_old / max(t_new, 1e-9):.1f}x)")
+    print(f"Textos idênticos: {same_text}")
+    print(f"Páginas iguais onde o método antigo achou o chunk: {same_pages}/{len(located)}")
+    print(f"Chunks em que o método antigo caiu no fallback 1..N: {len(old) - len(located)}")
+
+
+if __name__ == "__main__":
+    main()
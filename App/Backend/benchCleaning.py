@@ -0,0 +1,110 @@
+import argparse
+import re
+import time
+
+from collections import Counter
+from pathlib import Path
+from typing import List
+
+from extractorPDF import (
+    clean_and_format_pages,
+    extract_text_pages,
+    join_single_newlines,
+    normalize_spaces,
+)
+
+# Compara a limpeza antiga (dehyphenate em loop + várias passadas de regex +
+# splitlines duplo nos cabeçalhos/rodapés) com a passada única atual.
+
+_legacy_hyphen_linebreak = re.compile(r"(\w)-\n(\w)")
+
+
+def legacy_dehyphenate(text: str) -> str:
+    while True:
+        new = _legacy_hyphen_linebreak.sub(r"\1\2", text)
+        if new == text:
+            break
+        text = new
+    return text
+
+
+def legacy_remove_repeat_headers_footers(pages: List[str]) -> List[str]:
+    n = len(pages)
+    if n < 3:
+        return pages
+
+    top_lines = []
+    bottom_lines = []
+    for p in pages:
+        lines = [ln.strip() for ln in p.splitlines() if ln.strip()]
+        if not lines:
+            top_lines.append("")
+            bottom_lines.append("")
+            continue
+        top_lines.append(lines[0])
+        bottom_lines.append(lines[-1])
+
+    top_counter = Counter(top_lines)
+    bottom_counter = Counter(bottom_lines)
+
+    threshold = max(3, int(n * 0.7))
+
+    top_rep = {ln for ln, c in top_counter.items() if ln and c >= threshold}
+    bot_rep = {ln for ln, c in bottom_counter.items() if ln and c >= threshold}
+
+    cleaned = []
+    for p in pages:
+        lines = [ln for ln in p.splitlines()]
+        if lines and lines[0].strip() in top_rep:
+            lines = lines[1:]
+        if lines and lines[-1].strip() in bot_rep:
+            lines = lines[:-1]
+        cleaned.append("\n".join(lines))
+    return cleaned
+
+
+def legacy_clean_and_format_pages(pages: List[str]) -> List[str]:
+    cleaned_pages = []
+    for p in pages:
+        t = p
+        t = legacy_dehyphenate(t)
+        t = join_single_newlines(t)
+        t = normalize_spaces(t)
+        cleaned_pages.append(t)
+    return legacy_remove_repeat_headers_footers(cleaned_pages)
+
+
+def timed(fn, repeat: int):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark da limpeza de páginas (antiga x passada única).")
+    parser.add_argument("--pdf", default="files/Conteudo_Completo.pdf", help="PDF usado no benchmark.")
+    parser.add_argument("--copies", type=int, default=10, help="Quantas vezes repetir as páginas extraídas.")
+    parser.add_argument("--repeat", type=int, default=5, help="Execuções por método (vale a melhor).")
+    parser.add_argument("--workers", type=int, default=1, help="Processos para a limpeza em lote.")
+    args = parser.parse_args()
+
+    raw_pages = extract_text_pages(Path(args.pdf)) * max(1, args.copies)
+    raw_bytes = sum(len(p.encode("utf-8")) for p in raw_pages)
+
+    t_old, old = timed(lambda: legacy_clean_and_format_pages(raw_pages), args.repeat)
+    t_new, new = timed(lambda: clean_and_format_pages(raw_pages, workers=args.workers), args.repeat)
+
+    identical = "\f".join(old).encode("utf-8") == "\f".join(new).encode("utf-8")
+
+    print(f"Páginas: {len(raw_pages)} | Texto bruto: {raw_bytes / 1e6:.2f} MB")
+    print(f"Antiga:  {t_old * 1000:.1f} ms ({raw_bytes / 1e6 / t_old:.1f} MB/s)")
+    print(f"Nova:    {t_new * 1000:.1f} ms ({raw_bytes / 1e6 / t_new:.1f} MB/s)  ({t_old / max(t_new, 1e-9):.1f}x)")
+    print(f"Saída byte a byte idêntica: {identical}")
+
+
+if __name__ == "__main__":
+    main()
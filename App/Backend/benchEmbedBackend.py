@@ -0,0 +1,57 @@
+import argparse
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from embedBackend import get_backend
+from embedCache import EmbedCache
+from embedGenerate import EmbedGenerate
+
+# Latência de embed_query com perguntas sequenciais e simultâneas (agrupadas pelo
+# QueryBatcher). Com --backend hashing roda sem rede; com local mede o modelo na CPU.
+
+
+class CountingBackend():
+    def __init__(self, backend):
+        self.backend = backend
+        self.name = backend.name
+        self.calls = 0
+
+    def __call__(self, texts, task_type='search_document'):
+        self.calls += 1
+        return self.backend(texts, task_type)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de embed_query por backend.")
+    parser.add_argument("--backend", default="hashing", choices=["hashing", "local", "remote"])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    questions = [f"o que é sinapse {i}?" for i in range(args.queries)]
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = CountingBackend(get_backend(args.backend))
+        embedder = EmbedGenerate(cache=EmbedCache(Path(tmp) / "cache.sqlite"), embedder=backend)
+
+        t0 = time.perf_counter()
+        for q in questions:
+            embedder.embed_query(q)
+        sequential = time.perf_counter() - t0
+        calls_sequential = backend.calls
+
+        backend.calls = 0
+        concurrent = [f"{q} (2)" for q in questions]
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            list(executor.map(embedder.embed_query, concurrent))
+        parallel = time.perf_counter() - t0
+
+    print(f"Backend: {backend.name}")
+    print(f"Sequencial: {sequential / args.queries * 1000:.2f} ms/pergunta, {calls_sequential} chamadas ao backend")
+    print(f"{args.concurrency} simultâneas: {parallel / args.queries * 1000:.2f} ms/pergunta, {backend.calls} chamadas ao backend")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import argparse
+import time
+
+from embedPipeline import EmbedPipeline, FakeEmbedder
+
+# Teste de carga offline do pipeline de embeddings: compara uma única requisição
+# com todos os textos contra lotes concorrentes, usando o FakeEmbedder com latência.
+
+
+def fake_chunks(n: int):
+    for i in range(n):
+        yield f"chunk {i} sobre sinapses, neurotransmissores e potencial de ação."
+
+
+def run(label, n, embedder, **kwargs):
+    pipeline = EmbedPipeline(embedder, **kwargs)
+    t0 = time.perf_counter()
+    vectors = list(pipeline.embed(fake_chunks(n)))
+    elapsed = time.perf_counter() - t0
+    print(
+        f"{label:<28} {elapsed:7.2f}s  {n / elapsed:8.1f} textos/s  "
+        f"lotes={pipeline.stats['batches']} retries={pipeline.stats['retries']}"
+    )
+    return vectors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do EmbedPipeline com embedder falso.")
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--dim", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=0.05, help="Latência fixa por chamada (s).")
+    parser.add_argument("--per-text", type=float, default=0.0005, help="Latência por texto (s).")
+    parser.add_argument("--failure-rate", type=float, default=0.3)
+    args = parser.parse_args()
+
+    def embedder(failure_rate=0.0):
+        return FakeEmbedder(
+            dim=args.dim, latency=args.latency, per_text_latency=args.per_text, failure_rate=failure_rate
+        )
+
+    reference = run("1 requisição", args.texts, embedder(), batch_size=args.texts, max_workers=1)
+    for batch_size, workers in [(64, 1), (64, 4), (64, 8), (256, 4)]:
+        out = run(f"lote={batch_size} threads={workers}", args.texts, embedder(), batch_size=batch_size, max_workers=workers)
+        assert out == reference, "ordem dos vetores diferente da referência"
+
+    out = run(
+        f"lote=64 threads=8 falhas={args.failure_rate:.0%}", args.texts, embedder(args.failure_rate),
+        batch_size=64, max_workers=8, backoff=0.01,
+    )
+    assert out == reference, "ordem dos vetores diferente da referência"
+    print("Vetores idênticos e na mesma ordem em todas as configurações.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from vectorIndex import FlatIndex, LocalCollection, normalize_rows
+
+# Tamanho do índice, latência e recall@k de coleções truncadas (Matryoshka) e/ou
+# quantizadas (float16, int8) contra a busca exata em 768-d float32. Os vetores
+# sintéticos têm variância decrescente por dimensão, como os de um modelo Matryoshka
+# (os primeiros componentes carregam a maior parte da informação).
+
+
+def matryoshka_like(n, dim, clusters, rng):
+    decay = 1.0 / np.sqrt(1.0 + np.arange(dim) / 32.0)
+    centers = rng.standard_normal((clusters, dim)) * decay
+    labels = rng.integers(0, clusters, size=n)
+    noise = rng.standard_normal((n, dim)) * decay * 0.35
+    return normalize_rows((centers[labels] + noise).astype(np.float32))
+
+
+def recall_at_k(ids, exact_rows, k):
+    return float(np.mean([len(set(map(int, got)) & set(e.tolist())) / k for got, e in zip(ids, exact_rows)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de dimensão/quantização dos vetores.")
+    parser.add_argument("--n", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=8)
+    parser.add_argument("--rescore", type=int, default=4, help="Candidatos por resultado reordenados em float32.")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    data = matryoshka_like(args.n + args.queries, 768, 2000, rng)
+    vectors, queries = data[:args.n], data[args.n:]
+    _, exact_rows = FlatIndex(vectors).search(queries, args.k)
+    docs = [str(i) for i in range(args.n)]
+
+    print(f"{args.n} vetores, {args.queries} perguntas, recall@{args.k} contra 768-d float32 exato")
+    print(f"{'dim':>4} {'tipo':>8} {'reordena':>9} {'índice MB':>10} {'ms/pergunta':>12} {'recall':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for dim in (768, 512, 256, 128):
+            for dtype in ("float32", "float16", "int8"):
+                for rescore in ((0, args.rescore) if (dim, dtype) != (768, "float32") else (0,)):
+                    collection = LocalCollection.create(f"{tmp}/{dim}-{dtype}", vectors, docs, dim=dim, dtype=dtype,
+                                                        keep_full=bool(rescore), rescore=rescore)
+                    collection.query(queries[:4], k=args.k)
+                    t0 = time.perf_counter()
+                    result = collection.query(queries, k=args.k)
+                    elapsed = time.perf_counter() - t0
+                    print(f"{dim:>4} {dtype:>8} {('x' + str(rescore)) if rescore else '-':>9} "
+                          f"{collection.index_nbytes() / 1e6:>10.1f} {elapsed / args.queries * 1000:>12.3f} "
+                          f"{recall_at_k(result['documents'], exact_rows, args.k):>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from vectorIndex import FlatIndex, IVFIndex, LocalCollection, normalize_rows
+
+# Recall@k e latência da busca aproximada (IVF) contra a busca exata, em vetores
+# sintéticos agrupados (parecidos com embeddings de chunks de um mesmo livro).
+
+
+def clustered_vectors(n, dim, clusters, rng):
+    centers = normalize_rows(rng.standard_normal((clusters, dim)))
+    labels = rng.integers(0, clusters, size=n)
+    noise = rng.standard_normal((n, dim)).astype(np.float32) * (0.6 / np.sqrt(dim))
+    return normalize_rows(centers[labels] + noise)
+
+
+def recall_at_k(approx_rows, exact_rows):
+    hits = [len(set(a.tolist()) & set(e.tolist())) / len(e) for a, e in zip(approx_rows, exact_rows)]
+    return float(np.mean(hits))
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return time.perf_counter() - t0, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de recall/latência: busca exata x IVF.")
+    parser.add_argument("--n", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=8)
+    parser.add_argument("--nlist", type=int, default=0, help="0 = raiz de n.")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = clustered_vectors(args.n, args.dim, 500, rng)
+    queries = clustered_vectors(args.queries, args.dim, 500, np.random.default_rng(1))
+
+    flat = FlatIndex(vectors)
+    t_single, _ = timed(lambda: [flat.search(q, args.k) for q in queries])
+    t_batch, (_, exact_rows) = timed(lambda: flat.search(queries, args.k))
+    print(f"Vetores: {args.n} x {args.dim} ({vectors.nbytes / 1e6:.0f} MB float32)")
+    print(f"Exata, 1 pergunta por vez: {t_single / args.queries * 1000:.2f} ms/pergunta")
+    print(f"Exata, em lote:            {t_batch / args.queries * 1000:.2f} ms/pergunta")
+
+    t_build, (ivf, order) = timed(lambda: IVFIndex.build(vectors, nlist=args.nlist or None))
+    print(f"IVF: {ivf.centroids.shape[0]} listas, construído em {t_build:.1f}s")
+    exact_in_ivf_order = np.argsort(order)[exact_rows]
+    for nprobe in (1, 4, 8, 16, 32):
+        t, (_, rows) = timed(lambda: ivf.search(queries, args.k, nprobe=nprobe))
+        print(f"  nprobe={nprobe:<3} {t / args.queries * 1000:.2f} ms/pergunta  recall@{args.k}={recall_at_k(rows, exact_in_ivf_order):.3f}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        docs = [str(i) for i in range(args.n)]
+        LocalCollection.create(tmp, vectors, docs, nlist=ivf.centroids.shape[0])
+        t_open, collection = timed(lambda: LocalCollection.open(tmp))
+        t, result = timed(lambda: collection.query(queries, k=args.k, nprobe=16))
+        recall = np.mean([len(set(map(int, got)) & set(e.tolist())) / args.k for got, e in zip(result["documents"], exact_rows)])
+        print(f"Coleção em disco (memory-map): abre em {t_open * 1000:.0f} ms, "
+              f"{t / args.queries * 1000:.2f} ms/pergunta com nprobe=16, recall@{args.k}={recall:.3f}")
+
+
+if __name__ == "__main__":
+    main()
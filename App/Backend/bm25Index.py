@@ -0,0 +1,182 @@
+import argparse
+import json
+import os
+import re
+import unicodedata
+from pathlib import Path
+
+import numpy as np
+
+from vectorIndex import top_k
+
+#Índice invertido BM25 em memória, construído a partir do JSONL de ChunkRecords do
+#extractorPDF. As listas de postings ficam em formato CSR: um vetor de doc ids
+#(int32) e um de frequências (uint16) contíguos, com offsets por termo.
+
+_token = re.compile(r"\w+")
+
+STOPWORDS = frozenset("""
+a ao aos aquela aquelas aquele aqueles aquilo as ate com como da das de dela delas dele deles
+depois do dos e ela elas ele eles em entre era eram essa essas esse esses esta estas este estes
+eu foi foram ha isso isto ja la lhe lhes mais mas me mesmo meu minha muito na nao nas nem no nos
+nossa nosso num numa o os ou para pela pelas pelo pelos por qual quando que quem se sem ser seu
+sua suas seus so sao tambem te tem ter um uma umas uns voce voces
+""".split())
+
+
+def fold(text: str) -> str:
+    folded = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in folded if not unicodedata.combining(c))
+
+
+#Radical leve para o português (só plurais, no estilo do stemmer de Savoy): "neurônios"
+#e "neurônio" viram o mesmo termo sem mexer em siglas e nomes curtos
+def light_stem(token: str) -> str:
+    if len(token) <= 3 or token.isdigit():
+        return token
+    for suffix, repl in (("oes", "ao"), ("aes", "ao"), ("ais", "al"), ("eis", "el"), ("ois", "ol"),
+                         ("ns", "m"), ("res", "r"), ("les", "l"), ("zes", "z")):
+        if token.endswith(suffix):
+            return token[:-len(suffix)] + repl
+    if token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str):
+    return [light_stem(t) for t in _token.findall(fold(text)) if t not in STOPWORDS]
+
+
+class BM25Index():
+    def __init__(self, vocab, offsets, postings_docs, postings_tfs, doc_lengths, ids, documents, metadatas,
+                 k1=1.2, b=0.75, generation=0):
+        self.vocab = vocab
+        self.offsets = offsets
+        self.postings_docs = postings_docs
+        self.postings_tfs = postings_tfs
+        self.doc_lengths = doc_lengths
+        self.ids = ids
+        self.documents = documents
+        self.metadatas = metadatas
+        self.k1 = k1
+        self.b = b
+        self.generation = generation
+        self.avg_length = float(doc_lengths.mean()) if len(doc_lengths) else 0.0
+        df = np.diff(offsets)
+        n = len(doc_lengths)
+        self.idf = np.log(1.0 + (n - df + 0.5) / (df + 0.5)).astype(np.float32)
+        #Parte do denominador do BM25 que só depende do documento
+        self.norm = (k1 * (1.0 - b + b * doc_lengths / max(self.avg_length, 1e-9))).astype(np.float32)
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    @classmethod
+    def build(cls, documents, ids=None, metadatas=None, **kwargs):
+        documents = list(documents)
+        ids = list(ids) if ids is not None else [str(i) for i in range(len(documents))]
+        metadatas = list(metadatas) if metadatas is not None else [{} for _ in documents]
+        vocab = {}
+        postings = []
+        doc_lengths = np.zeros(len(documents), dtype=np.int32)
+        for row, text in enumerate(documents):
+            tokens = tokenize(text)
+            doc_lengths[row] = len(tokens)
+            counts = {}
+            for t in tokens:
+                counts[t] = counts.get(t, 0) + 1
+            for t, tf in counts.items():
+                term_id = vocab.setdefault(t, len(vocab))
+                if term_id == len(postings):
+                    postings.append([])
+                postings[term_id].append((row, tf))
+
+        sizes = np.array([len(p) for p in postings], dtype=np.int64)
+        offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+        postings_docs = np.empty(int(offsets[-1]), dtype=np.int32)
+        postings_tfs = np.empty(int(offsets[-1]), dtype=np.uint16)
+        for term_id, plist in enumerate(postings):
+            a, b = offsets[term_id], offsets[term_id + 1]
+            postings_docs[a:b] = [r for r, _ in plist]
+            postings_tfs[a:b] = [min(tf, 65535) for _, tf in plist]
+        return cls(vocab, offsets, postings_docs, postings_tfs, doc_lengths, ids, documents, metadatas, **kwargs)
+
+    @classmethod
+    def from_jsonl(cls, jsonl_path, **kwargs):
+        documents, ids, metadatas = [], [], []
+        with open(jsonl_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                r = json.loads(line)
+                documents.append(r["text"])
+                ids.append(f"{r['doc_id']}:{r['chunk_index']}")
+                metadatas.append({k: r[k] for k in ("doc_id", "source_path", "page_from", "page_to", "chunk_index")})
+        return cls.build(documents, ids=ids, metadatas=metadatas, **kwargs)
+
+    def save(self, path):
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        terms = sorted(self.vocab, key=self.vocab.get)
+        np.savez(path / "postings.npz", offsets=self.offsets, docs=self.postings_docs,
+                 tfs=self.postings_tfs, doc_lengths=self.doc_lengths)
+        meta = {"terms": terms, "ids": self.ids, "documents": self.documents, "metadatas": self.metadatas,
+                "k1": self.k1, "b": self.b, "generation": self.generation}
+        tmp = path / "meta.json.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp, path / "meta.json")
+
+    @classmethod
+    def load(cls, path):
+        path = Path(path)
+        with open(path / "meta.json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        arrays = np.load(path / "postings.npz")
+        vocab = {t: i for i, t in enumerate(meta["terms"])}
+        return cls(vocab, arrays["offsets"], arrays["docs"], arrays["tfs"], arrays["doc_lengths"],
+                   meta["ids"], meta["documents"], meta["metadatas"],
+                   k1=meta.get("k1", 1.2), b=meta.get("b", 0.75), generation=meta.get("generation", 0))
+
+    #Só os documentos que contêm algum termo da pergunta são pontuados
+    def search(self, question: str, k=8):
+        term_ids = sorted({self.vocab[t] for t in tokenize(question) if t in self.vocab})
+        if not term_ids:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+        docs = np.concatenate([self.postings_docs[self.offsets[t]:self.offsets[t + 1]] for t in term_ids])
+        tfs = np.concatenate([self.postings_tfs[self.offsets[t]:self.offsets[t + 1]] for t in term_ids]).astype(np.float32)
+        idf = np.concatenate([np.full(self.offsets[t + 1] - self.offsets[t], self.idf[t], dtype=np.float32) for t in term_ids])
+        partial = idf * tfs * (self.k1 + 1.0) / (tfs + self.norm[docs])
+        rows, inverse = np.unique(docs, return_inverse=True)
+        scores = np.zeros(rows.shape[0], dtype=np.float32)
+        np.add.at(scores, inverse, partial)
+        best, pos = top_k(scores, k)
+        return best, rows[pos].astype(np.int64)
+
+    #Mesmo formato de resposta das coleções vetoriais (uma lista por pergunta)
+    def query(self, question: str, k=8):
+        scores, rows = self.search(question, k)
+        return {
+            "ids": [[self.ids[r] for r in rows]],
+            "documents": [[self.documents[r] for r in rows]],
+            "metadatas": [[self.metadatas[r] for r in rows]],
+            "scores": [[float(s) for s in scores]],
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cria o índice BM25 de um JSONL do extractorPDF.")
+    parser.add_argument("--jsonl", required=True, help="Arquivo JSONL gerado pelo extractorPDF.py.")
+    parser.add_argument("--collection", required=True, help="Nome da coleção (mesmo nome do índice vetorial).")
+    args = parser.parse_args()
+
+    path = Path(os.getenv("BM25_INDEX_DIR", ".cache/bm25")) / args.collection
+    generation = BM25Index.load(path).generation + 1 if (path / "meta.json").exists() else 0
+    index = BM25Index.from_jsonl(args.jsonl, generation=generation)
+    index.save(path)
+    print(f"Índice BM25 {args.collection}: {len(index)} chunks, {len(index.vocab)} termos, "
+          f"{index.postings_docs.size} postings em {path.as_posix()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import os
+
+from promptBuilder import estimate_tokens, truncate_to_tokens
+
+#Substituto do chat do genai (send_message / send_message_stream) com histórico
+#limitado: a cada chamada vão a persona, um resumo das conversas antigas e só as
+#últimas `window` trocas. Do turno atual o histórico guarda apenas history_text
+#(a pergunta), então o contexto recuperado pelo RAG não é reenviado nos turnos seguintes
+class CompactChat():
+    #summary_config é a configuração das chamadas de resumo: o config do chat pode limitar a
+    #resposta (ex.: max_output_tokens=10 no menuCMD) e cortaria o resumo
+    def __init__(self, client, model="gemma-3-27b-it", config=None, system_text="", window=None,
+                 summary_batch=None, summary_tokens=300, summary_model=None, counter=estimate_tokens,
+                 summary_config=None):
+        self.client = client
+        self.model = model
+        self.config = config
+        self.system_text = system_text
+        self.window = window if window is not None else int(os.getenv("CHAT_HISTORY_WINDOW", "6"))
+        #Trocas que saem da janela são resumidas em grupos (uma chamada extra a cada summary_batch turnos)
+        self.summary_batch = summary_batch or max(1, self.window // 2)
+        self.summary_tokens = summary_tokens
+        self.summary_model = summary_model or model
+        self.summary_config = summary_config if summary_config is not None else {
+            "temperature": 0.1,
+            "max_output_tokens": summary_tokens * 2,
+        }
+        self.counter = counter
+        self.summary = ""
+        self.turns = []
+        self.pending = []
+        self.turn_count = 0
+        self.summaries = 0
+        self.summary_errors = 0
+        self.last_stats = None
+
+    @staticmethod
+    def _content(role, text):
+        return {"role": role, "parts": [{"text": text}]}
+
+    def contents(self, message):
+        head = [self.system_text.strip()] if self.system_text.strip() else []
+        if self.summary:
+            head.append(f"Resumo da conversa até aqui:\n{self.summary}")
+        out = []
+        if head:
+            out += [self._content("user", "\n\n".join(head)), self._content("model", "Entendido.")]
+        for user_text, model_text in self.pending + self.turns:
+            out += [self._content("user", user_text), self._content("model", model_text)]
+        out.append(self._content("user", message))
+
+        self.last_stats = {
+            "history_turns": len(self.pending) + len(self.turns),
+            "summary_tokens": self.counter(self.summary) if self.summary else 0,
+            "request_tokens": sum(self.counter(c["parts"][0]["text"]) for c in out),
+        }
+        return out
+
+    def send_message(self, message, history_text=None):
+        response = self.client.models.generate_content(model=self.model, contents=self.contents(message), config=self.config)
+        self.record(history_text or message, response.text)
+        return response
+
+    def send_message_stream(self, message, history_text=None):
+        parts = []
+        stream = self.client.models.generate_content_stream(model=self.model, contents=self.contents(message), config=self.config)
+        for chunk in stream:
+            if chunk.text:
+                parts.append(chunk.text)
+            yield chunk
+        self.record(history_text or message, "".join(parts))
+
+    def record(self, user_text, model_text):
+        self.turns.append((user_text, model_text))
+        self.turn_count += 1
+        while len(self.turns) > self.window:
+            self.pending.append(self.turns.pop(0))
+        if len(self.pending) >= self.summary_batch:
+            self.summarize()
+
+    #Junta as trocas pendentes ao resumo anterior em uma chamada ao modelo. Roda depois da
+    #resposta já gerada: se falhar, as trocas continuam em pending (e no prompt) e o
+    #resumo é tentado de novo no próximo turno, sem perder a resposta do aluno
+    def summarize(self):
+        dialog = "\n".join(f"Aluno: {u}\nTutor: {m}" for u, m in self.pending)
+        prompt = (
+            "Atualize o resumo de uma conversa entre um aluno e um tutor de neurociência. "
+            f"Mantenha os temas tratados, dúvidas e erros do aluno, em no máximo {self.summary_tokens * 3 // 4} palavras.\n\n"
+            f"Resumo atual:\n{self.summary or '(vazio)'}\n\nNovas trocas:\n{dialog}\n\nNovo resumo:"
+        )
+        try:
+            response = self.client.models.generate_content(model=self.summary_model, contents=prompt,
+                                                           config=self.summary_config)
+            text = (response.text or "").strip()
+        except Exception:
+            self.summary_errors += 1
+            return
+        if not text:
+            self.summary_errors += 1
+            return
+        self.summary = truncate_to_tokens(text, self.summary_tokens, self.counter)
+        self.pending = []
+        self.summaries += 1
+
+    @property
+    def history(self):
+        out = [("user", self.summary)] if self.summary else []
+        for user_text, model_text in self.pending + self.turns:
+            out += [("user", user_text), ("model", model_text)]
+        return out
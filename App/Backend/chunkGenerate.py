@@ -1,77 +1,112 @@
+import re
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
 from extractorPDF import ExtractorPDF
 
+_separators = re.compile(r"[ ,]")
+_sentence_no_overlap = re.compile(r"[^.]*\.")
+
 class ChunkGenerate():
-    def __init__(self):
-        self.extractor = ExtractorPDF()
+    #Texto extraído por fonte, compartilhado entre instâncias: os chunks estáticos,
+    #dinâmicos e sem overlap do mesmo documento saem de uma única extração
+    _text_cache = OrderedDict()
+    _text_cache_size = 8
+
+    def __init__(self, extractor=None):
+        self.extractor = extractor if extractor is not None else ExtractorPDF()
         self.chunk_static_size = 500
         self.overlap_static_size = 50
         self.overlap_dinamic_size = 10
 
-    def create_static_chunk(self):
+    def get_text(self):
+        key = self.extractor.source_key()
+        cache = ChunkGenerate._text_cache
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+
         text = self.extractor.extract_pdf_to_text()
-        chunks = []
+        cache[key] = text
+        while len(cache) > ChunkGenerate._text_cache_size:
+            cache.popitem(last=False)
+        return text
+
+    def iter_static_chunk(self):
+        text = self.get_text()
         start = 0
         text_length = len(text)
 
         while start < text_length:
             end = min(start + self.chunk_static_size, text_length)
-            chunk = text[start:end]
-            chunks.append(chunk)
-            
+            yield text[start:end]
+
             if end >= text_length:
                 break
-                
+
             start += self.chunk_static_size - self.overlap_static_size
-            
+
             if self.overlap_static_size >= self.chunk_static_size:
                 start = end
-        
-        return chunks
-    
-    def create_dinamic_chunk(self):
-        text = self.extractor.extract_pdf_to_text()
-        chunks = []
+
+    #Um chunk por frase terminada em ".", precedido pelo overlap da frase anterior
+    #(o trecho final dela que contém overlap_dinamic_size separadores " " ou ",")
+    def iter_dinamic_chunk(self):
+        text = self.get_text()
+        separators = [m.start() for m in _separators.finditer(text)]
         overlap = ""
-        count = 0
-        index_letter = 0
         index_start = 0
-        index_overlap = 1
+        first = True
 
-        while index_letter < len(text):
-            if text[index_letter] == ".":
-                chunk = text[index_start:index_letter + 1]
-                index_start = index_letter + 2
-                chunks.append(overlap + chunk)
+        index_dot = text.find(".")
+        while index_dot != -1:
+            chunk = text[index_start:index_dot + 1]
+            yield overlap + chunk
 
-                while count < self.overlap_dinamic_size:
-                    if chunk[-index_overlap] in [" ", ","]:
-                        count += 1
-                    
-                    if index_overlap == len(chunk):
-                        break
+            overlap = self._dinamic_overlap(text, index_start, index_dot, separators, first)
+            index_start = index_dot + 2
+            first = False
+            index_dot = text.find(".", index_dot + 1)
 
-                    index_overlap += 1
+    #Mesmo resultado da varredura de trás para frente, caractere a caractere, da
+    #versão original, mas buscando o separador necessário por bisect. Na versão
+    #original, a partir do 2º chunk a contagem começa em 1 e o 1º caractere do
+    #chunk também é verificado; isso é reproduzido aqui.
+    def _dinamic_overlap(self, text, start, end, separators, first):
+        length = end + 1 - start
+        if length <= 0:
+            return ""
+        chunk = text[start:end + 1]
 
-                overlap = chunk[-index_overlap + 1:]
-                count = 1
-                index_overlap = 0
+        if first:
+            count = 0
+            if self.overlap_dinamic_size <= 0:
+                return chunk
+        else:
+            if self.overlap_dinamic_size <= 1:
+                return chunk[1:]
+            count = 1 + (chunk[0] in " ,")
+            if count >= self.overlap_dinamic_size:
+                return chunk
 
-            index_letter += 1
+        needed = self.overlap_dinamic_size - count
+        lo = bisect_left(separators, start)
+        hi = bisect_right(separators, end)
+        if hi - lo >= needed:
+            position = separators[hi - needed]
+            if position > start:
+                return text[position:end + 1]
 
-        return chunks
+        return chunk[1:] if length > 1 else chunk
 
-    def create_dinamic_chunk_no_overlap(self):
-        text = self.extractor.extract_pdf_to_text()
-        chunks = []
-        initial_point = 0
-        count = 0
+    def iter_dinamic_chunk_no_overlap(self):
+        for m in _sentence_no_overlap.finditer(self.get_text()):
+            yield m.group()
 
-        for i in text:
-            if i == ".":
-                chunk = text[initial_point:count + 1]
-                initial_point = count + 1
-                chunks.append(chunk)
+    def create_static_chunk(self):
+        return list(self.iter_static_chunk())
 
-            count += 1
+    def create_dinamic_chunk(self):
+        return list(self.iter_dinamic_chunk())
 
-        return chunks       
+    def create_dinamic_chunk_no_overlap(self):
+        return list(self.iter_dinamic_chunk_no_overlap())
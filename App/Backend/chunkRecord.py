@@ -0,0 +1,38 @@
+import json
+import sys
+from dataclasses import dataclass
+
+#Formato de um chunk compartilhado pela extração, pelo chunk store e pela ingestão.
+#Módulo à parte para que quem só lê chunks (RAG/API) não importe o extractorPDF
+#(PyMuPDF, pdfminer, multiprocessing)
+
+
+@dataclass
+class ChunkRecord:
+    # __slots__ em vez de __dict__ por instância; doc_id/source_path são compartilhados
+    # entre os chunks do mesmo PDF (from_dict usa sys.intern ao ler de JSON)
+    __slots__ = ("doc_id", "source_path", "page_from", "page_to", "chunk_index", "text")
+    doc_id: str
+    source_path: str
+    page_from: int
+    page_to: int
+    chunk_index: int
+    text: str
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ChunkRecord":
+        return cls(
+            doc_id=sys.intern(data["doc_id"]),
+            source_path=sys.intern(data["source_path"]),
+            page_from=data["page_from"],
+            page_to=data["page_to"],
+            chunk_index=data["chunk_index"],
+            text=data["text"],
+        )
+
+
+def record_line(r: ChunkRecord) -> bytes:
+    return (json.dumps(r.to_dict(), ensure_ascii=False) + "\n").encode("utf-8")
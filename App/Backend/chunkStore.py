@@ -0,0 +1,248 @@
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from chunkRecord import ChunkRecord, record_line
+
+#Armazém binário de chunks (alternativa ao JSONL do extractorPDF), uma pasta com:
+#  docs.json  tabela de documentos sem repetição (doc_id, source_path, primeira linha, nº de chunks)
+#  index.bin  uma linha de tamanho fixo por chunk (documento, chunk_index, páginas, offset e tamanho do texto)
+#  text.bin   textos UTF-8 concatenados
+#index.bin e text.bin são lidos por memory-map: buscar os k chunks de um top-k custa O(k),
+#sem carregar o corpus. O id de um chunk é o mesmo do resto do projeto: doc_id:chunk_index
+#docs.json guarda também o SHA-1 de index.bin + text.bin: coleções que leem textos do
+#armazém (vectorIndex.py) conferem essa impressão digital ao abrir
+
+STORE_VERSION = 2
+ROW_DTYPE = np.dtype([
+    ("doc", "<u4"),
+    ("chunk_index", "<u4"),
+    ("page_from", "<u4"),
+    ("page_to", "<u4"),
+    ("offset", "<u8"),
+    ("length", "<u4"),
+])
+_row = struct.Struct("<IIIIQI")
+
+
+class ChunkStoreWriter():
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._index = open(self.path / "index.bin.tmp", "wb")
+        self._text = open(self.path / "text.bin.tmp", "wb")
+        self.docs = []
+        self._doc_rows = {}
+        self.rows = 0
+        self.offset = 0
+        self._sha1 = hashlib.sha1()
+
+    def add(self, record: ChunkRecord):
+        key = (record.doc_id, record.source_path)
+        doc = self._doc_rows.get(key)
+        if doc is None:
+            doc = self._doc_rows[key] = len(self.docs)
+            self.docs.append({"doc_id": record.doc_id, "source_path": record.source_path,
+                              "first_row": self.rows, "count": 0, "contiguous": True})
+        entry = self.docs[doc]
+        # Linha = first_row + chunk_index enquanto os chunks do documento vierem em sequência
+        if record.chunk_index != entry["count"] or self.rows != entry["first_row"] + entry["count"]:
+            entry["contiguous"] = False
+        entry["count"] += 1
+
+        data = record.text.encode("utf-8")
+        row = _row.pack(doc, record.chunk_index, record.page_from, record.page_to, self.offset, len(data))
+        self._text.write(data)
+        self._index.write(row)
+        self._sha1.update(row)
+        self._sha1.update(data)
+        self.offset += len(data)
+        self.rows += 1
+
+    def add_many(self, records):
+        for r in records:
+            self.add(r)
+        return self
+
+    def close(self):
+        self._index.close()
+        self._text.close()
+        os.replace(self.path / "index.bin.tmp", self.path / "index.bin")
+        os.replace(self.path / "text.bin.tmp", self.path / "text.bin")
+        # docs.json por último. As trocas não são atômicas em conjunto: uma queda entre
+        # elas deixa binários novos com o docs.json antigo, e o ChunkStore confere os
+        # tamanhos ao abrir (não pega troca entre armazéns de tamanhos idênticos)
+        tmp = self.path / "docs.json.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": STORE_VERSION, "chunks": self.rows, "sha1": self._sha1.hexdigest(),
+                       "docs": self.docs}, f, ensure_ascii=False)
+        os.replace(tmp, self.path / "docs.json")
+
+    def abort(self):
+        self._index.close()
+        self._text.close()
+        for name in ("index.bin.tmp", "text.bin.tmp"):
+            (self.path / name).unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class ChunkStore():
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path / "docs.json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != STORE_VERSION:
+            raise ValueError(f"versão de chunk store não suportada: {meta.get('version')}")
+        self.docs = meta["docs"]
+        n = meta["chunks"]
+        self.fingerprint = {"chunks": n, "sha1": meta["sha1"]}
+        # np.memmap/mmap não aceitam arquivo vazio
+        index_size = (self.path / "index.bin").stat().st_size
+        if index_size != n * ROW_DTYPE.itemsize:
+            raise ValueError(f"index.bin com {index_size} bytes não corresponde aos {n} chunks do docs.json: {self.path}")
+        self.index = np.memmap(self.path / "index.bin", dtype=ROW_DTYPE, mode="r", shape=(n,)) if n else \
+            np.zeros(0, dtype=ROW_DTYPE)
+        self._text_file = open(self.path / "text.bin", "rb")
+        size = os.fstat(self._text_file.fileno()).st_size
+        end = int(self.index[-1]["offset"]) + int(self.index[-1]["length"]) if n else 0
+        if size != end:
+            self._text_file.close()
+            raise ValueError(f"text.bin com {size} bytes, o índice termina em {end}: {self.path}")
+        self.text = mmap.mmap(self._text_file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self._by_doc_id = {}
+        for i, d in enumerate(self.docs):
+            self._by_doc_id.setdefault(d["doc_id"], i)
+        self._scattered = None
+
+    @classmethod
+    def build(cls, path, records):
+        with ChunkStoreWriter(path) as writer:
+            writer.add_many(records)
+        return cls(path)
+
+    @classmethod
+    def from_jsonl(cls, jsonl_path, path):
+        with open(jsonl_path, "r", encoding="utf-8") as f:
+            return cls.build(path, (ChunkRecord.from_dict(json.loads(line)) for line in f if line.strip()))
+
+    def __len__(self):
+        return len(self.index)
+
+    @staticmethod
+    def split_id(chunk_id: str):
+        doc_id, _, chunk_index = chunk_id.rpartition(":")
+        return doc_id, int(chunk_index)
+
+    def row_of(self, chunk_id: str) -> int:
+        doc_id, chunk_index = self.split_id(chunk_id)
+        doc = self._by_doc_id.get(doc_id)
+        if doc is None:
+            raise KeyError(chunk_id)
+        entry = self.docs[doc]
+        if entry["contiguous"]:
+            if not 0 <= chunk_index < entry["count"]:
+                raise KeyError(chunk_id)
+            return entry["first_row"] + chunk_index
+        # Documento com chunks fora de ordem: mapa montado só na primeira consulta
+        if self._scattered is None:
+            self._scattered = {}
+            for row, (d, idx) in enumerate(zip(self.index["doc"].tolist(), self.index["chunk_index"].tolist())):
+                if not self.docs[d]["contiguous"]:
+                    self._scattered.setdefault((self.docs[d]["doc_id"], idx), row)
+        try:
+            return self._scattered[(doc_id, chunk_index)]
+        except KeyError:
+            raise KeyError(chunk_id) from None
+
+    def text_at(self, row: int) -> str:
+        r = self.index[row]
+        start = int(r["offset"])
+        return self.text[start:start + int(r["length"])].decode("utf-8")
+
+    def record_at(self, row: int) -> ChunkRecord:
+        r = self.index[row]
+        doc = self.docs[int(r["doc"])]
+        return ChunkRecord(
+            doc_id=doc["doc_id"],
+            source_path=doc["source_path"],
+            page_from=int(r["page_from"]),
+            page_to=int(r["page_to"]),
+            chunk_index=int(r["chunk_index"]),
+            text=self.text_at(row),
+        )
+
+    def get(self, ids):
+        return [self.record_at(self.row_of(i)) for i in ids]
+
+    def texts(self, ids):
+        return [self.text_at(self.row_of(i)) for i in ids]
+
+    def __iter__(self):
+        for row in range(len(self.index)):
+            yield self.record_at(row)
+
+    def export_jsonl(self, out_path):
+        with open(out_path, "wb") as f:
+            for r in self:
+                f.write(record_line(r))
+
+    def nbytes(self):
+        return sum((self.path / name).stat().st_size for name in ("docs.json", "index.bin", "text.bin"))
+
+    def close(self):
+        if isinstance(self.text, mmap.mmap):
+            self.text.close()
+        self._text_file.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Armazém binário de chunks (conversão de/para JSONL e consulta por id).")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Converte o JSONL do extractorPDF em um chunk store.")
+    build.add_argument("--jsonl", required=True)
+    build.add_argument("--store", required=True)
+    export = sub.add_parser("export", help="Exporta o chunk store para JSONL.")
+    export.add_argument("--store", required=True)
+    export.add_argument("--out", required=True)
+    get = sub.add_parser("get", help="Mostra os chunks dos ids (doc_id:chunk_index).")
+    get.add_argument("--store", required=True)
+    get.add_argument("ids", nargs="+")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        store = ChunkStore.from_jsonl(args.jsonl, args.store)
+        print(f"Chunk store {args.store}: {len(store)} chunks, {len(store.docs)} documentos, "
+              f"{store.nbytes() / 1e6:.1f} MB (JSONL: {os.path.getsize(args.jsonl) / 1e6:.1f} MB)")
+    elif args.command == "export":
+        store = ChunkStore(args.store)
+        store.export_jsonl(args.out)
+        print(f"Exportados {len(store)} chunks para {args.out}")
+    else:
+        store = ChunkStore(args.store)
+        for chunk_id in args.ids:
+            try:
+                r = store.record_at(store.row_of(chunk_id))
+            except (KeyError, ValueError):
+                print(f"[ERRO] id não encontrado: {chunk_id}", file=sys.stderr)
+                continue
+            print(f"[{chunk_id}] {Path(r.source_path).name} p.{r.page_from}-{r.page_to}\n{r.text}\n")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import hashlib
+import os
+import re
+import threading
+import unicodedata
+from concurrent.futures import Future
+
+try:
+    from nomic import embed
+except Exception:
+    embed = None
+
+try:
+    from gpt4all import Embed4All
+except Exception:
+    Embed4All = None
+
+#Backends de embedding: objetos chamáveis (textos, task_type) -> lista de vetores,
+#com um `name` que entra na chave do EmbedCache (vetores de backends diferentes
+#não se misturam)
+
+#API remota do Nomic (comportamento original do EmbedGenerate)
+class NomicRemoteBackend():
+    def __init__(self, model='nomic-embed-text-v1.5'):
+        if embed is None:
+            raise RuntimeError("pacote nomic não instalado")
+        self.model = model
+        self.name = model
+
+    def __call__(self, texts, task_type='search_document'):
+        return embed.text(
+            texts=list(texts),
+            model=self.model,
+            task_type=task_type
+        )['embeddings']
+
+
+#Mesmo modelo rodando na CPU via GPT4All. O modelo é carregado uma única vez por
+#processo e fica compartilhado entre instâncias, então as perguntas não pagam
+#carregamento nem ida à rede
+class NomicLocalBackend():
+    _models = {}
+    _models_lock = threading.Lock()
+
+    def __init__(self, model_file='nomic-embed-text-v1.5.f16.gguf', device='cpu'):
+        if Embed4All is None:
+            raise RuntimeError("pacote gpt4all não instalado")
+        self.model_file = model_file
+        self.device = device
+        self.name = f"{model_file}:local"
+        self._lock = threading.Lock()
+
+    def _model(self):
+        key = (self.model_file, self.device)
+        with NomicLocalBackend._models_lock:
+            if key not in NomicLocalBackend._models:
+                NomicLocalBackend._models[key] = Embed4All(self.model_file, device=self.device)
+            return NomicLocalBackend._models[key]
+
+    #Deixa o modelo carregado antes da primeira pergunta
+    def warm_up(self):
+        self._model()
+        return self
+
+    def __call__(self, texts, task_type='search_document'):
+        model = self._model()
+        with self._lock:
+            return model.embed(list(texts), prefix=task_type)
+
+
+_hash_token = re.compile(r"\w+")
+
+
+#Backend determinístico por feature hashing (sem rede nem modelo): textos com
+#palavras em comum ficam próximos, o que basta para medir o resto do caminho do RAG
+class HashingBackend():
+    def __init__(self, dim=768):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def vector(self, text, task_type='search_document'):
+        folded = unicodedata.normalize("NFKD", text.lower())
+        folded = "".join(c for c in folded if not unicodedata.combining(c))
+        out = [0.0] * self.dim
+        for token in _hash_token.findall(folded):
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dim
+            out[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = sum(x * x for x in out) ** 0.5 or 1.0
+        return [x / norm for x in out]
+
+    def __call__(self, texts, task_type='search_document'):
+        return [self.vector(t, task_type) for t in texts]
+
+
+def get_backend(name=None):
+    name = name or os.getenv("EMBED_BACKEND", "remote")
+    if name == "remote":
+        return NomicRemoteBackend()
+    if name == "local":
+        return NomicLocalBackend(device=os.getenv("EMBED_DEVICE", "cpu")).warm_up()
+    if name == "hashing":
+        return HashingBackend()
+    raise ValueError(f"backend de embedding desconhecido: {name}")
+
+
+#Junta perguntas que chegam ao mesmo tempo (ex.: várias requisições da API) em uma
+#única chamada ao embedder. Com max_wait=0 nenhuma pergunta espera à toa: o lote é
+#o que se acumulou enquanto a chamada anterior rodava
+class QueryBatcher():
+    def __init__(self, embedder, max_batch=32, max_wait=0.0):
+        self.embedder = embedder
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._cond = threading.Condition()
+        self._queue = []
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def submit(self, text, task_type='search_document'):
+        future = Future()
+        with self._cond:
+            self._queue.append((text, task_type, future))
+            self._cond.notify()
+        return future
+
+    def embed(self, text, task_type='search_document'):
+        return self.submit(text, task_type).result()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                if self.max_wait > 0:
+                    self._cond.wait_for(lambda: len(self._queue) >= self.max_batch, timeout=self.max_wait)
+                batch, self._queue = self._queue[:self.max_batch], self._queue[self.max_batch:]
+
+            by_task = {}
+            for item in batch:
+                by_task.setdefault(item[1], []).append(item)
+            for task_type, items in by_task.items():
+                try:
+                    vectors = self.embedder([t for t, _, _ in items], task_type)
+                    for (_, _, future), vector in zip(items, vectors):
+                        future.set_result(vector)
+                except Exception as e:
+                    for _, _, future in items:
+                        future.set_exception(e)
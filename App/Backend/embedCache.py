@@ -0,0 +1,99 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from pathlib import Path
+
+#Cache persistente de embeddings em SQLite. A chave é o SHA-256 de
+#(modelo, task_type, texto do chunk) e o vetor fica como blob float32
+#(4 bytes por dimensão, em vez de uma lista JSON de floats)
+class EmbedCache():
+    def __init__(self, path=None, max_entries=200_000):
+        self.path = Path(path or os.getenv("EMBED_CACHE_PATH", ".cache/embeddings.sqlite"))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path.as_posix(), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings(last_used)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(text: str, model: str, task_type: str) -> str:
+        h = hashlib.sha256()
+        for part in (model, task_type, text):
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    @staticmethod
+    def to_float32(vector):
+        return array("f", vector).tolist()
+
+    #Devolve um vetor (ou None) para cada texto, na mesma ordem
+    def get_many(self, texts, model: str, task_type: str, batch_size: int = 500):
+        keys = [self.make_key(t, model, task_type) for t in texts]
+        found = {}
+        now = time.time()
+        with self._lock:
+            for i in range(0, len(keys), batch_size):
+                batch = keys[i:i + batch_size]
+                marks = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({marks})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[key] = vector.tolist()
+                if rows:
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_used = ? WHERE key = ?", [(now, k) for k, _ in rows]
+                    )
+            self._conn.commit()
+
+        result = [found.get(k) for k in keys]
+        hits = sum(1 for v in result if v is not None)
+        self.hits += hits
+        self.misses += len(result) - hits
+        return result
+
+    def put_many(self, texts, vectors, model: str, task_type: str):
+        now = time.time()
+        rows = [
+            (self.make_key(t, model, task_type), array("f", v).tobytes(), now)
+            for t, v in zip(texts, vectors)
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)", rows
+            )
+            self._evict()
+            self._conn.commit()
+
+    #Remove os menos usados recentemente quando passa de max_entries
+    def _evict(self):
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,32 +1,57 @@
-#Exemplo de uso do nomic com processamento local de embeddings
-from nomic import embed
+import os
 from chunkGenerate import ChunkGenerate
+from embedBackend import QueryBatcher, get_backend
+from embedCache import EmbedCache
+from embedPipeline import EmbedPipeline
+from vectorQuant import matryoshka
 
 #Classe que irá criar os embeddings dos textos e consultas
 class EmbedGenerate:
-    def __init__(self):
+    #embedder é um backend de embedBackend (remoto, local ou hashing) ou qualquer função
+    #(textos, task_type) -> vetores; sem ele, o backend vem da variável EMBED_BACKEND.
+    #Para processar localmente na CPU use EMBED_BACKEND=local
+    #dim (ou EMBED_DIM) trunca os vetores pelo método Matryoshka (512/256/128); o cache
+    #guarda sempre o vetor completo, então mudar a dimensão não exige reembedar
+    def __init__(self, cache=None, embedder=None, batch_size=64, max_workers=4, dim=None):
         self.chunks = ChunkGenerate()
-        
+        self.embedder = embedder if embedder is not None else get_backend()
+        self.model = getattr(self.embedder, 'name', 'nomic-embed-text-v1.5')
+        self.dim = dim or int(os.getenv("EMBED_DIM", "0")) or None
+        self.cache = cache if cache is not None else EmbedCache()
+        self.pipeline = EmbedPipeline(self.embed_batch, batch_size=batch_size, max_workers=max_workers)
+        self.query_batcher = QueryBatcher(self.embed_batch)
+
+    #Um lote do pipeline: consulta o cache e só envia ao embedder os textos que ainda não têm embedding
+    def embed_batch(self, texts, task_type='search_document'):
+        vectors = self.cache.get_many(texts, self.model, task_type)
+
+        missing = list(dict.fromkeys(t for t, v in zip(texts, vectors) if v is None))
+        if missing:
+            output = self.embedder(missing, task_type)
+            self.cache.put_many(missing, output, self.model, task_type)
+            new_vectors = dict(zip(missing, (EmbedCache.to_float32(v) for v in output)))
+            vectors = [v if v is not None else new_vectors[t] for t, v in zip(texts, vectors)]
+
+        if self.dim:
+            vectors = matryoshka(vectors, self.dim).tolist()
+        return vectors
+
+    #Aceita qualquer iterável (inclusive um gerador de chunks) e devolve os vetores em ordem,
+    #à medida que os lotes ficam prontos
+    def iter_embeddings(self, texts, task_type='search_document'):
+        return self.pipeline.embed(texts, task_type)
+
+    def embed_texts(self, texts, task_type='search_document'):
+        return list(self.iter_embeddings(texts, task_type))
+
     #Criador de embeddings, cria um dicionário com 4 chaves a partir de um documento dividido em blocos menores (chunks)
     def embed_text(self):
-        output = embed.text(
-            texts=self.chunks.create_dinamic_chunk(),
-            model='nomic-embed-text-v1.5',
-            task_type='search_document'
-            #inference_mode='local',
-            #device='cpu'
-        )['embeddings']
-        return output
-    
-    #Este código está implementado utilizando a API do Nomic, caso deseje processar localmente,
-    #Apague os hastags de inference_mode e device
+        return self.embed_texts(self.chunks.iter_dinamic_chunk(), task_type='search_document')
+
+    #Perguntas simultâneas (várias sessões) são agrupadas em uma chamada só pelo QueryBatcher
     def embed_query(self, query: str):
-        output = embed.text(
-            texts=[query],
-            model='nomic-embed-text-v1.5',
-            task_type='search_document'
-            #inference_mode='local',
-            #device='cpu'
-        )['embeddings']
-        return output
-    
\ No newline at end of file
+        return [self.query_batcher.embed(query, task_type='search_document')]
+
+    #Várias perguntas de uma vez, em um único lote
+    def embed_queries(self, queries):
+        return self.embed_texts(queries, task_type='search_document')
@@ -0,0 +1,103 @@
+import hashlib
+import random
+import struct
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+#Pipeline de embeddings em lotes: lê os textos de um iterável (pode ser um gerador
+#que ainda está extraindo/chunkeando), manda cada lote para o embedder em um pool
+#de threads limitado e devolve os vetores na ordem original. Um embedder é qualquer
+#função (textos, task_type) -> lista de vetores.
+class EmbedPipeline():
+    def __init__(self, embedder, batch_size=64, max_workers=4, max_in_flight=None,
+                 max_retries=3, backoff=0.5):
+        self.embedder = embedder
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        #Lotes submetidos e ainda não consumidos; acima disso a leitura da entrada para
+        self.max_in_flight = max_in_flight or max_workers * 2
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._lock = threading.Lock()
+        self.stats = {"texts": 0, "batches": 0, "retries": 0, "seconds": 0.0}
+
+    def _run_batch(self, batch, task_type):
+        attempt = 0
+        while True:
+            try:
+                vectors = self.embedder(batch, task_type)
+                if len(vectors) != len(batch):
+                    raise ValueError(f"embedder devolveu {len(vectors)} vetores para {len(batch)} textos")
+                return vectors
+            except Exception:
+                if attempt >= self.max_retries:
+                    raise
+                with self._lock:
+                    self.stats["retries"] += 1
+                #Backoff exponencial com jitter para não sincronizar as threads
+                time.sleep(self.backoff * (2 ** attempt) * (0.5 + random.random()))
+                attempt += 1
+
+    def iter_batches(self, texts):
+        it = iter(texts)
+        while True:
+            batch = list(islice(it, self.batch_size))
+            if not batch:
+                return
+            yield batch
+
+    def embed(self, texts, task_type='search_document'):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = deque()
+            for batch in self.iter_batches(texts):
+                pending.append((len(batch), executor.submit(self._run_batch, batch, task_type)))
+                if len(pending) >= self.max_in_flight:
+                    yield from self._collect(pending.popleft())
+            while pending:
+                yield from self._collect(pending.popleft())
+        self.stats["seconds"] += time.perf_counter() - started
+
+    def _collect(self, item):
+        size, future = item
+        vectors = future.result()
+        self.stats["texts"] += size
+        self.stats["batches"] += 1
+        return vectors
+
+
+#Embedder falso para testes de carga offline: vetores determinísticos derivados do
+#hash do texto, com latência por chamada e falhas simuladas
+class FakeEmbedder():
+    def __init__(self, dim=768, latency=0.0, per_text_latency=0.0, failure_rate=0.0, seed=0):
+        self.dim = dim
+        self.name = f"fake-{dim}"
+        self.latency = latency
+        self.per_text_latency = per_text_latency
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def vector(self, text, task_type='search_document'):
+        out = []
+        counter = 0
+        while len(out) < self.dim:
+            digest = hashlib.sha256(f"{task_type}\0{counter}\0{text}".encode("utf-8")).digest()
+            out.extend(b / 127.5 - 1.0 for b in struct.unpack("32B", digest))
+            counter += 1
+        out = out[:self.dim]
+        norm = sum(x * x for x in out) ** 0.5 or 1.0
+        return [x / norm for x in out]
+
+    def __call__(self, texts, task_type='search_document'):
+        with self._lock:
+            self.calls += 1
+            fail = self._random.random() < self.failure_rate
+        time.sleep(self.latency + self.per_text_latency * len(texts))
+        if fail:
+            raise RuntimeError("falha simulada do embedder")
+        return [self.vector(t, task_type) for t in texts]
@@ -1,13 +1,25 @@
 import argparse
 import hashlib
 import json
+import multiprocessing
+import os
 import re
+import shutil
+import signal
 import sys
-
-from collections import Counter
-from dataclasses import dataclass
+import tempfile
+import threading
+import time
+
+from bisect import bisect_right
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
-from typing import List
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from chunkRecord import ChunkRecord, record_line
+from pageCache import PageCache
 
 # --------------------------
 
@@ -21,6 +33,12 @@ try:
 except Exception:
     pdfminer_extract_text = None
 
+try:
+    from pdfminer.high_level import extract_pages as pdfminer_extract_pages
+    from pdfminer.layout import LTContainer, LTText, LTTextBox
+except Exception:
+    pdfminer_extract_pages = None
+
 # --------------------------
 
 
@@ -29,23 +47,72 @@ def read_binary(path: Path) -> bytes:
         return f.read()
 
 
+def file_sha1(path: Path, block_size: int = 1 << 20) -> str:
+    # Hash em blocos: não carrega o PDF inteiro na memória
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
 # -------------------------- Extração de texto
 
 
-def extract_with_pymupdf(pdf_path: Path) -> List[str]:
-    pages: List[str] = []
+def pymupdf_page_text(page) -> str:
+    blocks = page.get_text("blocks")
+    blocks.sort(key=lambda b: (round(b[1], 1), round(b[0], 1)))
+    page_buf: List[str] = []
+    for b in blocks:
+        text = b[4]
+        if text:
+            page_buf.append(text)
+    return "\n".join(page_buf)
+
+
+def iter_pages_pymupdf(pdf_path: Path) -> Iterator[str]:
     doc = fitz.open(pdf_path.as_posix())
-    for page in doc:
-        blocks = page.get_text("blocks")
-        blocks.sort(key=lambda b: (round(b[1], 1), round(b[0], 1)))
-        page_buf: List[str] = []
-        for b in blocks:
-            text = b[4]
-            if text:
-                page_buf.append(text)
-        pages.append("\n".join(page_buf))
-    doc.close()
-    return pages
+    try:
+        for page in doc:
+            yield pymupdf_page_text(page)
+    finally:
+        doc.close()
+
+
+def extract_with_pymupdf(pdf_path: Path) -> List[str]:
+    return list(iter_pages_pymupdf(pdf_path))
+
+
+def _render_pdfminer_layout(item, out: List[str]):
+    # Mesmo percurso do TextConverter usado por extract_text
+    if isinstance(item, LTContainer):
+        for child in item:
+            _render_pdfminer_layout(child, out)
+    elif isinstance(item, LTText):
+        out.append(item.get_text())
+    if isinstance(item, LTTextBox):
+        out.append("\n")
+
+
+def iter_pages_pdfminer(pdf_path: Path) -> Iterator[str]:
+    for layout in pdfminer_extract_pages(pdf_path.as_posix()):
+        buf: List[str] = []
+        _render_pdfminer_layout(layout, buf)
+        text = "".join(buf)
+        if text.strip():
+            yield text
+
+
+def pdfminer_pages_text(pdf_path: Path, page_numbers: List[int]) -> dict:
+    # Só as páginas pedidas são interpretadas (page_numbers), não o documento inteiro;
+    # o pdfminer as entrega em ordem crescente
+    out = {}
+    wanted = sorted(set(page_numbers))
+    for page_no, layout in zip(wanted, pdfminer_extract_pages(pdf_path.as_posix(), page_numbers=wanted)):
+        buf: List[str] = []
+        _render_pdfminer_layout(layout, buf)
+        out[page_no] = "".join(buf)
+    return out
 
 
 def extract_with_pdfminer(pdf_path: Path) -> List[str]:
@@ -55,10 +122,133 @@ def extract_with_pdfminer(pdf_path: Path) -> List[str]:
     return raw_pages
 
 
-def extract_text_pages(pdf_path: Path, prefer="pymupdf") -> List[str]:
+# -------------------------- Extração paralela por faixas de páginas
+
+
+class PageTimeout(Exception):
+    pass
+
+
+def _raise_page_timeout(signum, frame):
+    raise PageTimeout()
+
+
+def call_with_timeout(fn, timeout: float):
+    # SIGALRM só existe em POSIX e só pode ser armado na thread principal; fora
+    # disso a chamada roda sem limite (o prazo por faixa do pool continua valendo)
+    if timeout <= 0 or not hasattr(signal, "setitimer") or threading.current_thread() is not threading.main_thread():
+        return fn()
+    previous = signal.signal(signal.SIGALRM, _raise_page_timeout)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return fn()
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _extract_page_range(pdf_path: Path, start: int, stop: int, page_timeout: float) -> List[Optional[str]]:
+    # Roda em um processo do pool: cada worker abre o documento por conta própria.
+    # Página que falha ou estoura o tempo volta como None
+    doc = fitz.open(pdf_path.as_posix())
+    out: List[Optional[str]] = []
+    try:
+        for i in range(start, stop):
+            try:
+                out.append(call_with_timeout(lambda: pymupdf_page_text(doc[i]), page_timeout))
+            except Exception:
+                out.append(None)
+    finally:
+        doc.close()
+    return out
+
+
+def pdf_page_count(pdf_path: Path) -> int:
+    doc = fitz.open(pdf_path.as_posix())
+    try:
+        return doc.page_count
+    finally:
+        doc.close()
+
+
+def iter_pages_sharded(
+    pdf_path: Path,
+    workers: int = 2,
+    page_timeout: float = 0.0,
+    shard_pages: Optional[int] = None,
+    fallback_timeout: float = 60.0,
+    stats: Optional[dict] = None,
+) -> Iterator[str]:
+    # Faixas disjuntas de páginas extraídas pelo PyMuPDF em paralelo e devolvidas
+    # em ordem (no máximo 2 * workers faixas em voo). Só as páginas que falharam
+    # são reextraídas com o pdfminer
+    n_pages = pdf_page_count(pdf_path)
+    # Cada faixa reabre o documento e perde o cache de fontes do MuPDF: faixas
+    # pequenas demais custam mais do que o paralelismo devolve
+    shard_pages = shard_pages or max(32, -(-n_pages // (max(workers, 1) * 4)))
+    ranges = [(s, min(s + shard_pages, n_pages)) for s in range(0, n_pages, shard_pages)]
+    pool = multiprocessing.Pool(processes=min(workers, len(ranges))) if workers > 1 and len(ranges) > 1 else None
+    try:
+        pending = deque()
+        jobs = iter(ranges)
+
+        def submit():
+            for start, stop in jobs:
+                args = (pdf_path, start, stop, page_timeout)
+                if pool is None:
+                    pending.append((start, stop, _extract_page_range(*args)))
+                else:
+                    pending.append((start, stop, pool.apply_async(_extract_page_range, args)))
+                if len(pending) >= max(workers, 1) * 2:
+                    return
+
+        submit()
+        while pending:
+            start, stop, result = pending.popleft()
+            if pool is not None:
+                # Prazo da faixa inteira: pega também páginas presas dentro do MuPDF,
+                # onde o alarme do worker não interrompe
+                deadline = page_timeout * (stop - start + 1) if page_timeout > 0 else None
+                try:
+                    result = result.get(timeout=deadline)
+                except multiprocessing.TimeoutError:
+                    result = [None] * (stop - start)
+            submit()
+            failed = [i for i, text in enumerate(result, start=start) if text is None]
+            if failed:
+                recovered = _fallback_pages(pdf_path, failed, fallback_timeout, stats)
+                result = [recovered.get(i, "") if text is None else text for i, text in enumerate(result, start=start)]
+            yield from result
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+
+def _fallback_pages(pdf_path: Path, page_numbers: List[int], timeout: float, stats: Optional[dict]) -> dict:
+    if stats is not None:
+        stats["fallback_pages"] = stats.get("fallback_pages", 0) + len(page_numbers)
+    if not pdfminer_extract_pages:
+        return {}
+    try:
+        return call_with_timeout(lambda: pdfminer_pages_text(pdf_path, page_numbers), timeout)
+    except Exception:
+        return {}
+
+
+def extract_text_pages(
+    pdf_path: Path,
+    prefer="pymupdf",
+    page_workers: int = 1,
+    page_timeout: float = 0.0,
+    stats: Optional[dict] = None,
+) -> List[str]:
     if prefer == "pymupdf" and fitz:
         try:
-            pages = extract_with_pymupdf(pdf_path)
+            if page_workers > 1 or page_timeout > 0:
+                pages = list(iter_pages_sharded(pdf_path, workers=page_workers, page_timeout=page_timeout, stats=stats))
+            else:
+                pages = extract_with_pymupdf(pdf_path)
             if any(p.strip() for p in pages):
                 return pages
         except Exception:
@@ -75,23 +265,63 @@ def extract_text_pages(pdf_path: Path, prefer="pymupdf") -> List[str]:
     return []
 
 
+def iter_text_pages(
+    pdf_path: Path,
+    prefer="pymupdf",
+    page_workers: int = 1,
+    page_timeout: float = 0.0,
+    stats: Optional[dict] = None,
+) -> Iterator[str]:
+    # Versão em streaming de extract_text_pages. Páginas vazias iniciais ficam
+    # retidas até aparecer texto; só então o extrator é considerado válido e
+    # deixa de existir fallback (as páginas já entregues não voltam atrás).
+    extractors = []
+    if prefer == "pymupdf" and fitz:
+        if page_workers > 1 or page_timeout > 0:
+            extractors.append(partial(iter_pages_sharded, workers=page_workers, page_timeout=page_timeout, stats=stats))
+        else:
+            extractors.append(iter_pages_pymupdf)
+    if pdfminer_extract_pages:
+        extractors.append(iter_pages_pdfminer)
+
+    for extractor in extractors:
+        pending: List[str] = []
+        committed = False
+        try:
+            for page in extractor(pdf_path):
+                if committed:
+                    yield page
+                elif page.strip():
+                    committed = True
+                    yield from pending
+                    yield page
+                else:
+                    pending.append(page)
+        except Exception:
+            if committed:
+                raise
+            continue
+        if committed:
+            return
+
+
 # -------------------------- Limpeza/reconstrução
 
-_hyphen_linebreak = re.compile(r"(\w)-\n(\w)")
+_hyphen_linebreak = re.compile(r"(?<=\w)-\n(?=\w)")
 _newline_in_para = re.compile(r"(?<!\n)\n(?!\n)")
 _multi_newlines = re.compile(r"\n{3,}")
 _multi_spaces = re.compile(r"[ \t]{2,}")
 _trailing_spaces = re.compile(r"[ \t]+\n")
 _whitespace = re.compile(r"[ \t]+")
 
+# Passada única equivalente a join_single_newlines + normalize_spaces: só casa
+# sequências de espaço que mudam (com quebra de linha, tab ou 2+ espaços)
+_whitespace_run = re.compile(r"(?:[ \t]*\n[ \t\n]*|[ \t]{2,}|\t)")
+
 
 def dehyphenate(text: str) -> str:
-    while True:
-        new = _hyphen_linebreak.sub(r"\1\2", text)
-        if new == text:
-            break
-        text = new
-    return text
+    # Com lookarounds uma passada basta: "a-\nb-\nc" não precisa mais do loop
+    return _hyphen_linebreak.sub("", text)
 
 
 def join_single_newlines(text: str) -> str:
@@ -105,53 +335,102 @@ def normalize_spaces(text: str) -> str:
     return _whitespace.sub(" ", text).strip()
 
 
+def _normalize_run(m) -> str:
+    # 2+ quebras seguidas viram parágrafo ("\n\n"), com " " se sobrar espaço ou
+    # quebra isolada depois do último bloco; o resto vira um espaço simples
+    run = m.group()
+    last = run.rfind("\n\n")
+    if last == -1:
+        return " "
+    return "\n\n " if last + 2 < len(run) else "\n\n"
+
+
+def edge_lines(lines: List[str]) -> Tuple[str, str]:
+    top = next((ln.strip() for ln in lines if ln.strip()), "")
+    if not top:
+        return "", ""
+    bottom = next(ln.strip() for ln in reversed(lines) if ln.strip())
+    return top, bottom
+
+
+def repeated_edges(top_lines, bottom_lines, n: int):
+    threshold = max(3, int(n * 0.7))
+    top_rep = {ln for ln, c in Counter(top_lines).items() if ln and c >= threshold}
+    bot_rep = {ln for ln, c in Counter(bottom_lines).items() if ln and c >= threshold}
+    return top_rep, bot_rep
+
+
+def strip_edges(lines: List[str], top_rep, bot_rep) -> str:
+    if lines and lines[0].strip() in top_rep:
+        lines = lines[1:]
+    if lines and lines[-1].strip() in bot_rep:
+        lines = lines[:-1]
+    return "\n".join(lines)
+
+
 def remove_repeat_headers_footers(pages: List[str]) -> List[str]:
     n = len(pages)
     if n < 3:
         return pages
 
-    top_lines = []
-    bottom_lines = []
-    for p in pages:
-        lines = [ln.strip() for ln in p.splitlines() if ln.strip()]
-        if not lines:
-            top_lines.append("")
-            bottom_lines.append("")
-            continue
-        top_lines.append(lines[0])
-        bottom_lines.append(lines[-1])
+    split_pages = [p.splitlines() for p in pages]
+    edges = [edge_lines(lines) for lines in split_pages]
+    top_rep, bot_rep = repeated_edges([t for t, _ in edges], [b for _, b in edges], n)
 
-    top_counter = Counter(top_lines)
-    bottom_counter = Counter(bottom_lines)
+    return [strip_edges(lines, top_rep, bot_rep) for lines in split_pages]
 
-    threshold = max(3, int(n * 0.7))
 
-    top_rep = {ln for ln, c in top_counter.items() if ln and c >= threshold}
-    bot_rep = {ln for ln, c in bottom_counter.items() if ln and c >= threshold}
+def clean_page(page: str) -> str:
+    if "-\n" in page:
+        page = dehyphenate(page)
+    return _whitespace_run.sub(_normalize_run, page).strip()
 
-    cleaned = []
-    for p in pages:
-        lines = [ln for ln in p.splitlines()]
-        if lines and lines[0].strip() in top_rep:
-            lines = lines[1:]
-        if lines and lines[-1].strip() in bot_rep:
-            lines = lines[:-1]
-        cleaned.append("\n".join(lines))
-    return cleaned
 
+def clean_pages_batch(pages: List[str], workers: int = 1, chunksize: int = 64) -> List[str]:
+    # clean_page não depende das outras páginas, então o lote pode ir para um pool
+    if workers <= 1 or len(pages) <= chunksize:
+        return [clean_page(p) for p in pages]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(clean_page, pages, chunksize=chunksize))
 
-def clean_and_format_pages(pages: List[str]) -> List[str]:
-    cleaned_pages = []
-    for p in pages:
-        t = p
-        t = dehyphenate(t)
-        t = join_single_newlines(t)
-        t = normalize_spaces(t)
-        cleaned_pages.append(t)
+
+def clean_and_format_pages(pages: List[str], workers: int = 1) -> List[str]:
+    cleaned_pages = clean_pages_batch(pages, workers=workers)
     cleaned_pages = remove_repeat_headers_footers(cleaned_pages)
     return cleaned_pages
 
 
+def iter_clean_pages(pages: Iterable[str]) -> Iterator[str]:
+    # Cabeçalhos/rodapés repetidos só são conhecidos depois de ver todas as
+    # páginas: a 1ª passada limpa e despeja cada página num arquivo temporário
+    # guardando apenas a primeira/última linha; a 2ª relê uma página por vez.
+    top_lines: List[str] = []
+    bottom_lines: List[str] = []
+    lengths: List[int] = []
+    with tempfile.TemporaryFile("w+", encoding="utf-8", newline="") as spool:
+        for p in pages:
+            t = clean_page(p)
+            top, bottom = edge_lines(t.splitlines())
+            top_lines.append(top)
+            bottom_lines.append(bottom)
+            lengths.append(len(t))
+            spool.write(t)
+
+        n = len(lengths)
+        if n < 3:
+            top_rep, bot_rep = set(), set()
+        else:
+            top_rep, bot_rep = repeated_edges(top_lines, bottom_lines, n)
+
+        spool.seek(0)
+        for length in lengths:
+            t = spool.read(length)
+            if n < 3:
+                yield t
+            else:
+                yield strip_edges(t.splitlines(), top_rep, bot_rep)
+
+
 # -------------------------- Chunks
 
 _sentence_splitter = re.compile(r"([.!?。！？]+)(\s+)")
@@ -183,57 +462,162 @@ def make_chunks(
     max_chars: int = 1200,
     min_chars: int = 400,
     overlap: int = 150,
-) -> List[str]:
-    sentences = split_into_sentences(text)
-    chunks: List[str] = []
-    buf: List[str] = []
+    with_spans: bool = False,
+):
+    # Com with_spans=True devolve (texto, início, fim) de cada chunk em `text`,
+    # o que dispensa procurar o chunk de volta no texto para achar as páginas
+    spans = iter_chunk_spans(
+        iter_sentence_spans([text]), max_chars=max_chars, min_chars=min_chars, overlap=overlap
+    )
+    if with_spans:
+        return list(spans)
+    return [c for c, _, _ in spans]
+
+
+def iter_sentence_spans(pages: Iterable[str]) -> Iterator[Tuple[str, int, int]]:
+    # Mesmas frases de split_into_sentences("\n\n".join(pages)), com a posição
+    # (início, fim) de cada uma nesse texto, sem montá-lo inteiro na memória.
+    # O resto sem pontuação final de uma página é carregado para a seguinte.
+    carry = ""
+    base = 0
+    sep = ""
+    for page in pages:
+        buf = carry + sep + page
+        sep = "\n\n"
+        pos = 0
+        for m in _sentence_splitter.finditer(buf):
+            span = _stripped_span(buf, pos, m.end(1), base)
+            if span:
+                yield span
+            pos = m.end()
+        carry = buf[pos:]
+        base += pos
+    span = _stripped_span(carry, 0, len(carry), base)
+    if span:
+        yield span
+
+
+def _stripped_span(buf: str, a: int, b: int, base: int) -> Optional[Tuple[str, int, int]]:
+    seg = buf[a:b]
+    full = seg.strip()
+    if not full:
+        return None
+    start = base + a + (len(seg) - len(seg.lstrip()))
+    return full, start, start + len(full)
+
+
+def iter_chunk_spans(
+    sentences: Iterable[Tuple[str, int, int]],
+    max_chars: int = 1200,
+    min_chars: int = 400,
+    overlap: int = 150,
+) -> Iterator[Tuple[str, int, int]]:
+    # Agrupa frases como make_chunks e devolve (texto, início, fim) à medida que
+    # cada chunk fecha. Em make_chunks o tail de overlap calculado no flush é
+    # sempre sobrescrito pela frase seguinte (e o flush final descarta o buffer),
+    # então min_chars/overlap não alteram a saída; aqui isso é reproduzido para
+    # manter os chunks idênticos.
+    buf: List[Tuple[str, int, int]] = []
     buf_len = 0
-
-    def flush(force=False):
-        nonlocal buf, buf_len
-        if not buf:
-            return
-        joined = " ".join(buf).strip()
-        if force or len(joined) >= min_chars or not chunks:
-            chunks.append(joined)
-            if overlap > 0:
-                start = max(0, len(joined) - overlap)
-                tail = joined[start:]
-                space_pos = tail.find(" ")
-                if space_pos > 0 and space_pos < len(tail) - 1:
-                    tail = tail[space_pos + 1 :]
-                tail = tail.lstrip()
-                buf = [tail] if tail else []
-                buf_len = len(tail)
-            else:
-                buf = []
-                buf_len = 0
-
-    for s in sentences:
-        if not s:
-            continue
+    for sent in sentences:
+        s = sent[0]
         if buf_len + len(s) + 1 <= max_chars:
-            buf.append(s)
+            buf.append(sent)
             buf_len += len(s) + 1
         else:
-            flush(force=True)
-            buf = [s]
+            if buf:
+                yield " ".join(x[0] for x in buf), buf[0][1], buf[-1][2]
+            buf = [sent]
             buf_len = len(s)
-    flush(force=True)
-    chunks = [c.strip() for c in chunks if c.strip()]
-    return chunks
+    if buf:
+        yield " ".join(x[0] for x in buf), buf[0][1], buf[-1][2]
+
+
+# -------------------------- Cache de páginas limpas
+
+# Aumente ao mudar a extração ou a limpeza: entradas antigas do cache deixam de valer
+EXTRACTOR_VERSION = 1
+CLEANER_VERSION = 1
+
+
+def page_cache_tag(prefer: str) -> str:
+    return f"{prefer}-x{EXTRACTOR_VERSION}-c{CLEANER_VERSION}"
+
+
+def _merge_stats(stats: Optional[dict], extract_stats: dict, cached: bool):
+    if stats is None:
+        return
+    stats["page_cache_hit"] = cached
+    if extract_stats.get("fallback_pages"):
+        stats["fallback_pages"] = stats.get("fallback_pages", 0) + extract_stats["fallback_pages"]
+
+
+def load_clean_pages(
+    pdf_path: Path,
+    doc_hash: str,
+    prefer: str = "pymupdf",
+    page_workers: int = 1,
+    page_timeout: float = 0.0,
+    page_cache: Optional[str] = None,
+    stats: Optional[dict] = None,
+) -> List[str]:
+    cache = PageCache(page_cache) if page_cache else None
+    tag = page_cache_tag(prefer)
+    pages = cache.get(doc_hash, tag) if cache is not None else None
+    if pages is not None:
+        _merge_stats(stats, {}, cached=True)
+        return pages
+
+    extract_stats: dict = {}
+    pages = extract_text_pages(pdf_path, prefer=prefer, page_workers=page_workers, page_timeout=page_timeout,
+                               stats=extract_stats)
+    if any(p.strip() for p in pages):
+        pages = clean_and_format_pages(pages)
+    # Páginas que caíram no pdfminer por timeout dependem da máquina: não entram no cache
+    if cache is not None and not extract_stats.get("fallback_pages"):
+        cache.put(doc_hash, tag, pages)
+    _merge_stats(stats, extract_stats, cached=False)
+    return pages
+
+
+def iter_load_clean_pages(
+    pdf_path: Path,
+    doc_hash: str,
+    prefer: str = "pymupdf",
+    page_workers: int = 1,
+    page_timeout: float = 0.0,
+    page_cache: Optional[str] = None,
+    stats: Optional[dict] = None,
+) -> Iterator[str]:
+    # Versão em streaming: as páginas são gravadas no cache à medida que saem da limpeza
+    cache = PageCache(page_cache) if page_cache else None
+    tag = page_cache_tag(prefer)
+    # Valida a entrada antes do primeiro yield: um arquivo corrompido no meio da leitura
+    # deixaria o consumidor com metade do documento; inválida, é apagada e o PDF é reextraído
+    if cache is not None and cache.valid(doc_hash, tag):
+        yield from cache.iter_pages(doc_hash, tag)
+        _merge_stats(stats, {}, cached=True)
+        return
+
+    extract_stats: dict = {}
+    pages = iter_clean_pages(
+        iter_text_pages(pdf_path, prefer=prefer, page_workers=page_workers, page_timeout=page_timeout,
+                        stats=extract_stats)
+    )
+    if cache is None:
+        yield from pages
+    else:
+        yield from cache.cache_pages(doc_hash, tag, pages)
+        if extract_stats.get("fallback_pages"):
+            cache.path_for(doc_hash, tag).unlink(missing_ok=True)
+    _merge_stats(stats, extract_stats, cached=False)
 
 
 # -------------------------- Pipeline principal
 
-@dataclass
-class ChunkRecord:
-    doc_id: str
-    source_path: str
-    page_from: int
-    page_to: int
-    chunk_index: int
-    text: str
+def page_for_offset(page_starts: List[int], offset: int) -> int:
+    # page_starts[i] é o offset onde a página i + 1 começa no texto unido
+    return max(1, bisect_right(page_starts, offset))
 
 
 def process_pdf(
@@ -242,57 +626,43 @@ def process_pdf(
     max_chars: int = 1200,
     min_chars: int = 400,
     overlap: int = 150,
+    stats: Optional[dict] = None,
+    page_workers: int = 1,
+    page_timeout: float = 0.0,
+    page_cache: Optional[str] = None,
 ):
-    pages = extract_text_pages(pdf_path, prefer=prefer)
+    doc_hash = file_sha1(pdf_path)
+    if stats is not None:
+        stats["sha1"] = doc_hash
+
+    pages = load_clean_pages(
+        pdf_path, doc_hash, prefer=prefer, page_workers=page_workers, page_timeout=page_timeout,
+        page_cache=page_cache, stats=stats,
+    )
+
+    if stats is not None:
+        stats["pages"] = len(pages)
 
     if not any(p.strip() for p in pages):
         return []
 
-    pages = clean_and_format_pages(pages)
-
-    page_offsets = []
-    buf = []
+    page_starts = []
     total = 0
-    for i, p in enumerate(pages, start=1):
-        page_offsets.append((i, total, total + len(p)))
-        buf.append(p)
+    for p in pages:
+        page_starts.append(total)
         total += len(p) + 2
-    full_text = "\n\n".join(buf).strip()
-
-    chunk_texts = make_chunks(full_text, max_chars=max_chars, min_chars=min_chars, overlap=overlap)
+    full_text = "\n\n".join(pages)
 
-    def page_range_for_span(start_idx: int, end_idx: int):
-        start_page = 1
-        end_page = len(pages)
-        for (pg, a, b) in page_offsets:
-            if a <= start_idx <= b:
-                start_page = pg
-                break
-        for (pg, a, b) in page_offsets:
-            if a <= end_idx <= b:
-                end_page = pg
-                break
-        return start_page, end_page
-
-    doc_hash = hashlib.sha1(read_binary(pdf_path)).hexdigest()
+    chunk_spans = make_chunks(full_text, max_chars=max_chars, min_chars=min_chars, overlap=overlap, with_spans=True)
 
+    source_path = pdf_path.as_posix()
     chunk_records = []
-    cursor = 0
-    for idx, c in enumerate(chunk_texts):
-        pos = full_text.find(c, cursor)
-        if pos == -1:
-            pos = full_text.find(c)
-        if pos == -1:
-            pf, pt = (1, len(pages))
-        else:
-            pf, pt = page_range_for_span(pos, pos + len(c))
-            cursor = pos + len(c)
-
+    for idx, (c, start, end) in enumerate(chunk_spans):
         rec = ChunkRecord(
             doc_id=doc_hash,
-            source_path=pdf_path.as_posix(),
-            page_from=pf,
-            page_to=pt,
+            source_path=source_path,
+            page_from=page_for_offset(page_starts, start),
+            page_to=page_for_offset(page_starts, end - 1),
             chunk_index=idx,
             text=c,
         )
@@ -301,6 +671,51 @@ def process_pdf(
     return chunk_records
 
 
+def iter_pdf_records(
+    pdf_path: Path,
+    prefer: str = "pymupdf",
+    max_chars: int = 1200,
+    min_chars: int = 400,
+    overlap: int = 150,
+    stats: Optional[dict] = None,
+    page_workers: int = 1,
+    page_timeout: float = 0.0,
+    page_cache: Optional[str] = None,
+) -> Iterator[ChunkRecord]:
+    # Caminho em streaming de process_pdf: páginas, frases e chunks fluem por
+    # geradores e cada ChunkRecord é entregue assim que fecha. A memória fica
+    # limitada à janela de páginas que ainda não fecharam uma frase.
+    doc_hash = file_sha1(pdf_path)
+    source_path = pdf_path.as_posix()
+    page_starts: List[int] = []
+
+    def tracked_pages():
+        total = 0
+        for p in iter_load_clean_pages(
+            pdf_path, doc_hash, prefer=prefer, page_workers=page_workers, page_timeout=page_timeout,
+            page_cache=page_cache, stats=stats,
+        ):
+            page_starts.append(total)
+            total += len(p) + 2
+            yield p
+
+    sentences = iter_sentence_spans(tracked_pages())
+    chunks = iter_chunk_spans(sentences, max_chars=max_chars, min_chars=min_chars, overlap=overlap)
+    for idx, (text, start, end) in enumerate(chunks):
+        yield ChunkRecord(
+            doc_id=doc_hash,
+            source_path=source_path,
+            page_from=page_for_offset(page_starts, start),
+            page_to=page_for_offset(page_starts, end - 1),
+            chunk_index=idx,
+            text=text,
+        )
+
+    if stats is not None:
+        stats["pages"] = len(page_starts)
+        stats["sha1"] = doc_hash
+
+
 def iter_pdf_files(input_path: Path):
     if input_path.is_file() and input_path.suffix.lower() == ".pdf":
         yield input_path
@@ -310,6 +725,131 @@ def iter_pdf_files(input_path: Path):
                 yield p
 
 
+# -------------------------- Texto corrido (usado por ChunkGenerate)
+
+_token = re.compile(r"[^ .]*[ .]")
+
+
+class ExtractorPDF():
+    def __init__(self, pdf_path="files/Conteudo_Completo.pdf", prefer="pymupdf"):
+        self.pdf_path = Path(pdf_path)
+        self.prefer = prefer
+
+    #Identifica a fonte; muda quando o arquivo é alterado
+    def source_key(self):
+        st = self.pdf_path.stat()
+        return (self.pdf_path.resolve().as_posix(), self.prefer, st.st_size, st.st_mtime_ns)
+
+    #Texto do PDF inteiro em uma linha, com espaços normalizados
+    def extract_pdf_to_text(self):
+        pages = extract_text_pages(self.pdf_path, prefer=self.prefer)
+        return " ".join(" ".join(pages).split())
+
+    #Tokens terminados em espaço ou ponto (o resto final sem delimitador é descartado)
+    def extract_pdf_to_token(self):
+        return _token.findall(self.extract_pdf_to_text())
+
+
+# -------------------------- Execução paralela
+
+def _process_job(pdf_path: Path, options: dict, spool_path: Path, streaming: bool = False):
+    # Roda em um processo do pool: os chunks vão para um arquivo de spool em vez
+    # de voltarem por pickle, e erros voltam como texto para não derrubar o lote
+    stats = {"pages": 0, "chunks": 0}
+    try:
+        if streaming:
+            recs = iter_pdf_records(pdf_path, stats=stats, **options)
+        else:
+            recs = process_pdf(pdf_path=pdf_path, stats=stats, **options)
+        with open(spool_path, "wb") as f:
+            for r in recs:
+                f.write(record_line(r))
+                stats["chunks"] += 1
+        return pdf_path, spool_path, stats, None
+    except Exception as e:
+        return pdf_path, spool_path, stats, str(e)
+
+
+def iter_processed_pdfs(
+    pdfs,
+    options: dict,
+    spool_dir: Path,
+    workers: int = 1,
+    streaming: bool = False,
+) -> Iterator[Tuple[Path, Path, dict, Optional[str]]]:
+    # Devolve os resultados na mesma ordem dos PDFs de entrada, com no máximo
+    # 2 * workers arquivos em voo para não acumular spool em disco
+    jobs = ((pdf, options, spool_dir / f"{i}.jsonl", streaming) for i, pdf in enumerate(pdfs))
+    if workers <= 1:
+        for job in jobs:
+            yield _process_job(*job)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for job in jobs:
+            pending.append(executor.submit(_process_job, *job))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+# -------------------------- Reingestão incremental
+
+MANIFEST_VERSION = 2
+
+
+def manifest_path_for(out_path: Path) -> Path:
+    return out_path.with_name(out_path.name + ".manifest.json")
+
+
+def load_manifest(manifest_path: Path, out_path: Path) -> dict:
+    # Sem o JSONL correspondente o manifesto não serve para nada
+    if not manifest_path.is_file() or not out_path.is_file():
+        return {}
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if data.get("version") != MANIFEST_VERSION:
+        return {}
+    return data.get("docs", {})
+
+
+def save_manifest(manifest_path: Path, docs: dict):
+    tmp_path = manifest_path.with_name(manifest_path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": MANIFEST_VERSION, "docs": docs}, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, manifest_path)
+
+
+def is_unchanged(pdf: Path, entry: Optional[dict], options: dict) -> bool:
+    # Tamanho + mtime iguais bastam; se só o mtime mudou, confirma pelo SHA-1
+    if not entry or entry.get("params") != options:
+        return False
+    st = pdf.stat()
+    if st.st_size != entry["size"]:
+        return False
+    if st.st_mtime_ns == entry["mtime_ns"]:
+        return True
+    if file_sha1(pdf) == entry["sha1"]:
+        entry["mtime_ns"] = st.st_mtime_ns
+        return True
+    return False
+
+
+def copy_range(src, dst, offset: int, length: int, block_size: int = 1 << 20):
+    src.seek(offset)
+    while length > 0:
+        block = src.read(min(block_size, length))
+        if not block:
+            break
+        dst.write(block)
+        length -= len(block)
+
+
 def main():
     parser = argparse.ArgumentParser(description="Extrair e chunkear PDFs para busca vetorial (gera um único JSONL).")
     parser.add_argument("--input", required=True, help="Arquivo PDF ou pasta com PDFs.")
@@ -318,71 +858,122 @@ def main():
     parser.add_argument("--max-chars", type=int, default=1200, help="Tamanho máximo de chunk.")
     parser.add_argument("--min-chars", type=int, default=400, help="Tamanho mínimo desejado para flush do buffer.")
     parser.add_argument("--overlap", type=int, default=150, help="Overlap (em caracteres) entre chunks.")
+    parser.add_argument("--workers", type=int, default=1, help="Número de processos para extrair PDFs em paralelo.")
+    parser.add_argument("--incremental", action="store_true", help="Pula PDFs inalterados desde a última execução (usa o manifesto).")
+    parser.add_argument("--streaming", action="store_true", help="Extrai e chunkeia página a página, com memória limitada.")
+    parser.add_argument("--page-workers", type=int, default=1, help="Processos extraindo faixas de páginas de um mesmo PDF.")
+    parser.add_argument("--page-timeout", type=float, default=0.0, help="Tempo máximo por página em segundos (0 = sem limite); páginas que estouram são extraídas pelo pdfminer.")
+    parser.add_argument("--page-cache", nargs="?", const=os.getenv("PAGE_CACHE_DIR", ".cache/pages"), default=None,
+                        help="Reaproveita páginas já extraídas e limpas (pasta opcional; padrão .cache/pages).")
+    parser.add_argument("--chunk-store", default=None, help="Também grava os chunks em um chunk store binário (chunkStore.py) nesta pasta.")
     args = parser.parse_args()
 
     input_path = Path(args.input).expanduser().resolve()
     out_path = Path(args.out).expanduser().resolve()
     out_path.parent.mkdir(parents=True, exist_ok=True)
 
+    options = {
+        "prefer": args.prefer,
+        "max_chars": args.max_chars,
+        "min_chars": args.min_chars,
+        "overlap": args.overlap,
+    }
+
+    manifest_path = manifest_path_for(out_path)
+    old_docs = load_manifest(manifest_path, out_path) if args.incremental else {}
+    new_docs = {}
+
+    pdfs = list(iter_pdf_files(input_path))
+    unchanged = {pdf for pdf in pdfs if is_unchanged(pdf, old_docs.get(pdf.as_posix()), options)}
+    to_process = [pdf for pdf in pdfs if pdf not in unchanged]
+
     all_chunks = 0
-    with open(out_path.as_posix(), "w", encoding="utf-8") as fout:
-        for pdf in iter_pdf_files(input_path):
-            try:
-                recs = process_pdf(
-                    pdf_path=pdf,
-                    prefer=args.prefer,
-                    max_chars=args.max_chars,
-                    min_chars=args.min_chars,
-                    overlap=args.overlap,
-                )
-                for r in recs:
-                    fout.write(json.dumps(r.__dict__, ensure_ascii=False) + "\n")
-                print(f"[OK] {pdf.name}: {len(recs)} chunks")
-                all_chunks += len(recs)
-            except Exception as e:
-                print(f"[ERRO] {pdf}: {e}", file=sys.stderr)
+    all_pages = 0
+    new_chunks = 0
+    skipped = 0
+    errors = 0
+    fallback_pages = 0
+    cached_pdfs = 0
+    started = time.perf_counter()
+
+    # Escreve num temporário e troca no final: uma execução interrompida não trunca a saída anterior
+    tmp_path = out_path.with_name(out_path.name + ".tmp")
+    spool_dir = Path(tempfile.mkdtemp(prefix=".spool-", dir=out_path.parent))
+    old_file = open(out_path, "rb") if old_docs else None
+    try:
+        with open(tmp_path, "wb") as fout:
+            # Paralelismo por página e cache de páginas não mudam a saída, então ficam fora dos parâmetros do manifesto
+            job_options = dict(options, page_workers=args.page_workers, page_timeout=args.page_timeout,
+                               page_cache=args.page_cache)
+            results = iter_processed_pdfs(
+                to_process, job_options, spool_dir, workers=args.workers, streaming=args.streaming
+            )
+            for pdf in pdfs:
+                key = pdf.as_posix()
+                entry = old_docs.get(key)
+                if pdf not in unchanged:
+                    _, spool_path, stats, error = next(results)
+                    if error is None:
+                        st = pdf.stat()
+                        offset = fout.tell()
+                        with open(spool_path, "rb") as src:
+                            shutil.copyfileobj(src, fout)
+                        os.remove(spool_path)
+                        n_chunks = stats["chunks"]
+                        new_docs[key] = {
+                            "size": st.st_size,
+                            "mtime_ns": st.st_mtime_ns,
+                            "sha1": stats.get("sha1") or file_sha1(pdf),
+                            "params": options,
+                            "chunks": n_chunks,
+                            "offset": offset,
+                            "length": fout.tell() - offset,
+                        }
+                        print(f"[OK] {pdf.name}: {n_chunks} chunks")
+                        all_chunks += n_chunks
+                        new_chunks += n_chunks
+                        all_pages += stats["pages"]
+                        fallback_pages += stats.get("fallback_pages", 0)
+                        cached_pdfs += bool(stats.get("page_cache_hit"))
+                        continue
+                    print(f"[ERRO] {pdf}: {error}", file=sys.stderr)
+                    errors += 1
+                    if not entry:
+                        continue
+                    # Mantém os chunks antigos; o arquivo será tentado de novo na próxima execução
+                    entry["mtime_ns"] = -1
+                else:
+                    print(f"[=] {pdf.name}: inalterado ({entry['chunks']} chunks)")
+                    skipped += 1
+
+                offset = fout.tell()
+                copy_range(old_file, fout, entry["offset"], entry["length"])
+                new_docs[key] = dict(entry, offset=offset)
+                all_chunks += entry["chunks"]
+    finally:
+        if old_file is not None:
+            old_file.close()
+        shutil.rmtree(spool_dir, ignore_errors=True)
+
+    os.replace(tmp_path, out_path)
+    save_manifest(manifest_path, new_docs)
+    if args.chunk_store:
+        from chunkStore import ChunkStore
+
+        ChunkStore.from_jsonl(out_path, args.chunk_store).close()
+    elapsed = max(time.perf_counter() - started, 1e-9)
 
     print(f"Concluído. Total de chunks: {all_chunks}")
+    print(f"Páginas processadas: {all_pages} | Inalterados: {skipped} | Erros: {errors} | Tempo: {elapsed:.2f}s")
+    if args.page_cache:
+        print(f"PDFs lidos do cache de páginas: {cached_pdfs}/{len(to_process)}")
+    if fallback_pages:
+        print(f"Páginas extraídas pelo pdfminer após falha/timeout: {fallback_pages}")
+    print(f"Vazão: {all_pages / elapsed:.2f} páginas/s, {new_chunks / elapsed:.2f} chunks/s")
     print(f"Saída: {out_path.as_posix()}")
+    if args.chunk_store:
+        print(f"Chunk store: {Path(args.chunk_store).resolve().as_posix()}")
 
 
 if __name__ == "__main__":
     main()
-
-
-# ---------------
-
-"""
-import fitz
-
-class ExtractorPDF():
-    def __init__(self):
-        self.pdf_path = "files/Texto_Exemplo.pdf"
-        self.pdf_file = fitz.open(self.pdf_path)
-    
-    def extract_pdf_to_text(self):
-        text = ""
-
-        for page in self.pdf_file:
-            text += page.get_text("text")
-
-            text = text.replace("\n", " ")
-            text = " ".join(text.split())
-            
-        return text
-    
-    def extract_pdf_to_token(self):
-        tokens = []
-        initial_point = 0
-        count = 0
-        text = self.extract_pdf_to_text()
-
-        for i in text:
-            if i in [" ", "."]:
-                token = text[initial_point:count + 1]
-                initial_point = count + 1
-                tokens.append(token)
-            count += 1
-
-        return tokens
-    """
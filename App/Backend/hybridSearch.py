@@ -0,0 +1,66 @@
+import os
+from pathlib import Path
+
+from bm25Index import BM25Index
+
+#Reciprocal Rank Fusion: cada lista contribui 1 / (rrf_k + posição) para cada id;
+#não depende da escala das pontuações (cosseno x BM25)
+def rrf_fuse(ranked_lists, rrf_k=60, limit=None):
+    scores = {}
+    for ranked in ranked_lists:
+        for rank, item_id in enumerate(ranked, start=1):
+            scores[item_id] = scores.get(item_id, 0.0) + 1.0 / (rrf_k + rank)
+    fused = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+    return fused[:limit] if limit else fused
+
+
+#Busca híbrida: vetorial (qualquer vector store com collection_query) + BM25 local da
+#mesma coleção, fundidas por RRF. Cada lado traz só `candidates` resultados
+class HybridRetriever():
+    #RagGenerate passa a pergunta em texto para quem declara uses_question
+    uses_question = True
+
+    def __init__(self, vector_store, base_dir=None, candidates=16, rrf_k=60):
+        self.vector_store = vector_store
+        self.base_dir = Path(base_dir or os.getenv("BM25_INDEX_DIR", ".cache/bm25"))
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+        self._indexes = {}
+        self._stamps = {}
+
+    def lexical_index(self, collection_name):
+        path = self.base_dir / collection_name
+        if not (path / "meta.json").exists():
+            return None
+        stamp = (path / "meta.json").stat().st_mtime_ns
+        if self._stamps.get(collection_name) != stamp:
+            self._indexes[collection_name] = BM25Index.load(path)
+            self._stamps[collection_name] = stamp
+        return self._indexes[collection_name]
+
+    def collection_version(self, collection_name):
+        version = getattr(self.vector_store, 'collection_version', None)
+        index = self.lexical_index(collection_name)
+        return (version(collection_name) if version is not None else None,
+                index.generation if index is not None else None)
+
+    def collection_query(self, query, collection_name, k=8, question=None, **kwargs):
+        candidates = max(k, self.candidates)
+        dense = self.vector_store.collection_query(query, collection_name, k=candidates, **kwargs)
+        index = self.lexical_index(collection_name)
+        if index is None or not question:
+            return {key: [values[:k] for values in lists] for key, lists in dense.items()}
+
+        lexical = index.query(question, k=candidates)
+        items = {}
+        for source in (lexical, dense):
+            for item_id, doc, meta in zip(source["ids"][0], source["documents"][0], source["metadatas"][0]):
+                items.setdefault(item_id, (doc, meta))
+
+        fused = rrf_fuse([dense["ids"][0], lexical["ids"][0]], rrf_k=self.rrf_k, limit=k)
+        return {
+            "ids": [[item_id for item_id, _ in fused]],
+            "documents": [[items[item_id][0] for item_id, _ in fused]],
+            "metadatas": [[items[item_id][1] for item_id, _ in fused]],
+            "distances": [[1.0 - score for _, score in fused]],
+        }
@@ -0,0 +1,532 @@
+import argparse
+import json
+import os
+import queue
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from chunkRecord import ChunkRecord
+from extractorPDF import is_unchanged, iter_pdf_files, iter_processed_pdfs
+
+#Ingestão de ponta a ponta em estágios ligados por filas limitadas:
+#  extração/chunking (processos) -> embedding (threads do EmbedPipeline) -> gravação (thread)
+#Uma fila cheia bloqueia o estágio anterior (backpressure), então só há em memória
+#o que cabe nas filas. Cada lote gravado atualiza o checkpoint, e uma nova execução
+#continua do último chunk confirmado de cada PDF.
+
+CHECKPOINT_VERSION = 1
+
+
+class PipelineAborted(Exception):
+    pass
+
+
+#Contadores de um estágio: itens, tempo trabalhando e tempo bloqueado na fila de saída
+class StageStats():
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.busy = 0.0
+        self.blocked = 0.0
+        self.started = None
+        self.finished = None
+
+    def info(self):
+        end = self.finished or time.perf_counter()
+        elapsed = max(end - (self.started or end), 1e-9)
+        return {
+            "items": self.items,
+            "seconds": elapsed,
+            "per_s": self.items / elapsed,
+            "busy_s": self.busy,
+            "blocked_s": self.blocked,
+        }
+
+
+#Ocupação de uma fila amostrada periodicamente (média e máximo)
+class QueueStats():
+    def __init__(self, name, q):
+        self.name = name
+        self.queue = q
+        self.samples = 0
+        self.total = 0
+        self.peak = 0
+
+    def sample(self):
+        size = self.queue.qsize()
+        self.samples += 1
+        self.total += size
+        self.peak = max(self.peak, size)
+        return size
+
+    def info(self):
+        return {
+            "maxsize": self.queue.maxsize,
+            "avg": self.total / self.samples if self.samples else 0.0,
+            "peak": self.peak,
+        }
+
+
+# -------------------------- Checkpoint
+
+def load_checkpoint(path: Path, target: dict) -> dict:
+    # Checkpoint de outro destino (coleção/sink) não vale para esta execução
+    if not path.is_file():
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if data.get("version") != CHECKPOINT_VERSION or data.get("target") != target:
+        return {}
+    return data
+
+
+def save_checkpoint(path: Path, data: dict):
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+# -------------------------- Destinos
+
+#Grava direto no MongoDB (upsert por _id = doc_id:chunk_index, então regravar é idempotente)
+class MongoSink():
+    def __init__(self, store, batch_size=500):
+        self.store = store
+        self.batch_size = batch_size
+
+    def state(self):
+        return {}
+
+    def restore(self, state):
+        pass
+
+    def write(self, records, vectors, docs):
+        self.store.upsert_records(records, vectors, batch_size=self.batch_size)
+
+    #PDF terminado: apaga os chunks de uma ingestão anterior além do novo total e os
+    #de um conteúdo anterior do mesmo arquivo (outro SHA-1), como o filtro do LocalSink.close
+    def finish_doc(self, key, entry):
+        self.store.prune_chunks({entry["sha1"]: entry["chunks"]}, {key: entry["sha1"]})
+
+    def close(self, docs):
+        pass
+
+
+#Acumula chunks e vetores (float32) em arquivos de spool e monta a coleção local no final;
+#o tamanho dos arquivos entra no checkpoint, então uma execução interrompida é truncada
+#de volta ao último lote confirmado. Cada chunk leva a geração do seu PDF no checkpoint:
+#reprocessar o PDF (conteúdo ou parâmetros novos) troca a geração e os chunks antigos
+#do spool deixam de entrar na coleção
+class LocalSink():
+    def __init__(self, store, collection_name, spool_dir: Path, **collection_options):
+        self.store = store
+        self.collection_name = collection_name
+        self.spool_dir = spool_dir
+        self.collection_options = collection_options
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        self.vectors_path = spool_dir / "vectors.f32"
+        self.records_path = spool_dir / "records.jsonl"
+        self.dim = None
+
+    def state(self):
+        return {
+            "dim": self.dim,
+            "vectors_bytes": self.vectors_path.stat().st_size if self.vectors_path.exists() else 0,
+            "records_bytes": self.records_path.stat().st_size if self.records_path.exists() else 0,
+        }
+
+    def restore(self, state):
+        self.dim = state.get("dim")
+        for path, size in ((self.vectors_path, state.get("vectors_bytes", 0)),
+                           (self.records_path, state.get("records_bytes", 0))):
+            with open(path, "ab") as f:
+                f.truncate(size)
+
+    def write(self, records, vectors, docs):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"dimensão {vectors.shape[1]} diferente da do spool ({self.dim})")
+        with open(self.vectors_path, "ab") as f:
+            f.write(vectors.tobytes())
+        with open(self.records_path, "ab") as f:
+            for r in records:
+                line = dict(r.to_dict(), generation=docs[r.source_path]["generation"])
+                f.write((json.dumps(line, ensure_ascii=False) + "\n").encode("utf-8"))
+
+    #Chunks de gerações antigas já ficam de fora no close
+    def finish_doc(self, key, entry):
+        pass
+
+    def close(self, docs):
+        if self.dim is None:
+            return
+        vectors = np.fromfile(self.vectors_path, dtype=np.float32).reshape(-1, self.dim)
+        with open(self.records_path, "r", encoding="utf-8") as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        # Só a versão atual de cada PDF (um PDF alterado ou rechunkeado deixa chunks antigos no spool)
+        keep = []
+        for i, r in enumerate(records):
+            entry = docs.get(r["source_path"], {})
+            if entry.get("sha1") == r["doc_id"] and entry.get("generation", 0) == r.get("generation", 0):
+                keep.append(i)
+        records = [records[i] for i in keep]
+        ids = [f"{r['doc_id']}:{r['chunk_index']}" for r in records]
+        if len(set(ids)) != len(ids):
+            raise ValueError("spool com chunks repetidos; rode de novo com --restart")
+        self.store.create_collection(
+            self.collection_name,
+            vectors[keep],
+            [r["text"] for r in records],
+            ids=ids,
+            metadatas=[{k: r[k] for k in ("doc_id", "source_path", "page_from", "page_to", "chunk_index")}
+                       for r in records],
+            **self.collection_options,
+        )
+
+
+# -------------------------- Pipeline
+
+class IngestPipeline():
+    def __init__(self, embed, sink, checkpoint_path: Path, target: dict, options: dict,
+                 workers=1, streaming=False, queue_size=256, store_batch=256, resume=True,
+                 page_workers=1, page_timeout=0.0, page_cache=None):
+        self.embed = embed
+        self.sink = sink
+        self.checkpoint_path = checkpoint_path
+        self.options = options
+        self.workers = workers
+        self.streaming = streaming
+        self.page_options = {"page_workers": page_workers, "page_timeout": page_timeout, "page_cache": page_cache}
+        self.store_batch = store_batch
+        self.chunks_queue = queue.Queue(maxsize=queue_size)
+        self.vectors_queue = queue.Queue(maxsize=queue_size)
+        self.stages = {name: StageStats(name) for name in ("extract", "embed", "store")}
+        self.queues = [QueueStats("chunks", self.chunks_queue), QueueStats("vectors", self.vectors_queue)]
+        self._abort = threading.Event()
+        self.errors = []
+
+        checkpoint = load_checkpoint(checkpoint_path, target) if resume else {}
+        self.checkpoint = {
+            "version": CHECKPOINT_VERSION,
+            "target": target,
+            "docs": checkpoint.get("docs", {}),
+            "sink": checkpoint.get("sink", {}),
+            "closed": checkpoint.get("closed", False),
+        }
+        self.sink.restore(self.checkpoint["sink"])
+
+    # Put/get com timeout para que um estágio bloqueado perceba a falha de outro
+    def _put(self, q, item, stage):
+        started = time.perf_counter()
+        while True:
+            try:
+                q.put(item, timeout=0.2)
+                break
+            except queue.Full:
+                if self._abort.is_set():
+                    raise PipelineAborted()
+        stage.blocked += time.perf_counter() - started
+
+    def _get(self, q):
+        while True:
+            try:
+                return q.get(timeout=0.2)
+            except queue.Empty:
+                if self._abort.is_set():
+                    raise PipelineAborted()
+
+    def _run(self, fn, stage):
+        stage.started = time.perf_counter()
+        try:
+            fn(stage)
+        except PipelineAborted:
+            pass
+        except Exception as e:
+            self.errors.append(f"{stage.name}: {e}")
+            self._abort.set()
+        finally:
+            stage.finished = time.perf_counter()
+
+    # -------------------------- Estágio 1: extração e chunking (processos)
+
+    def extract(self, stage):
+        docs = self.checkpoint["docs"]
+        pdfs = []
+        for pdf in self.pdfs:
+            entry = docs.get(pdf.as_posix())
+            if entry and entry.get("done") and is_unchanged(pdf, entry, self.options):
+                print(f"[=] {pdf.name}: já ingerido ({entry['chunks']} chunks)")
+                continue
+            pdfs.append(pdf)
+
+        spool_dir = Path(tempfile.mkdtemp(prefix=".spool-", dir=self.checkpoint_path.parent))
+        try:
+            results = iter_processed_pdfs(pdfs, dict(self.options, **self.page_options), spool_dir,
+                                          workers=self.workers, streaming=self.streaming)
+            for pdf, spool_path, stats, error in results:
+                if error is not None:
+                    print(f"[ERRO] {pdf}: {error}", file=sys.stderr)
+                    continue
+                t0 = time.perf_counter()
+                key = pdf.as_posix()
+                st = pdf.stat()
+                old = docs.get(key) or {}
+                entry = {
+                    "size": st.st_size,
+                    "mtime_ns": st.st_mtime_ns,
+                    "sha1": stats["sha1"],
+                    "params": self.options,
+                    "chunks": stats["chunks"],
+                    "committed": 0,
+                    "done": False,
+                    "generation": old.get("generation", 0),
+                }
+                # Mesmo conteúdo e parâmetros: continua do último chunk confirmado;
+                # senão é uma nova geração e os chunks gravados antes são descartados
+                if old.get("sha1") == entry["sha1"] and old.get("params") == self.options:
+                    entry["committed"] = old.get("committed", 0)
+                elif old:
+                    entry["generation"] += 1
+                stage.busy += time.perf_counter() - t0
+                self._put(self.chunks_queue, ("start", key, entry), stage)
+
+                with open(spool_path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        t0 = time.perf_counter()
+                        record = ChunkRecord.from_dict(json.loads(line))
+                        stage.busy += time.perf_counter() - t0
+                        if record.chunk_index < entry["committed"]:
+                            continue
+                        self._put(self.chunks_queue, record, stage)
+                        stage.items += 1
+                os.remove(spool_path)
+                self._put(self.chunks_queue, ("end", key, None), stage)
+        finally:
+            shutil.rmtree(spool_dir, ignore_errors=True)
+            if not self._abort.is_set():
+                self._put(self.chunks_queue, None, stage)
+
+    # -------------------------- Estágio 2: embedding (threads)
+
+    def embed_stage(self, stage):
+        # O EmbedPipeline devolve os vetores na ordem dos textos; os marcadores de
+        # início/fim de PDF ficam na fila `pending` entre os chunks e seguem na mesma ordem
+        pending = []
+        head = [0]
+
+        def texts():
+            while True:
+                item = self._get(self.chunks_queue)
+                if item is None:
+                    return
+                pending.append(item)
+                if isinstance(item, ChunkRecord):
+                    yield item.text
+
+        def forward_markers():
+            while head[0] < len(pending) and not isinstance(pending[head[0]], ChunkRecord):
+                self._put(self.vectors_queue, pending[head[0]], stage)
+                head[0] += 1
+
+        t0 = time.perf_counter()
+        for vector in self.embed.iter_embeddings(texts(), task_type='search_document'):
+            stage.busy += time.perf_counter() - t0
+            forward_markers()
+            self._put(self.vectors_queue, (pending[head[0]], vector), stage)
+            head[0] += 1
+            stage.items += 1
+            # Descarta o que já foi repassado (a lista não cresce com o corpus)
+            if head[0] > 1024:
+                del pending[:head[0]]
+                head[0] = 0
+            t0 = time.perf_counter()
+        forward_markers()
+        self._put(self.vectors_queue, None, stage)
+
+    # -------------------------- Estágio 3: gravação e checkpoint
+
+    def store(self, stage):
+        docs = self.checkpoint["docs"]
+        records, vectors = [], []
+
+        def flush():
+            if records:
+                t0 = time.perf_counter()
+                self.sink.write(records, vectors, docs)
+                self.checkpoint["closed"] = False
+                for r in records:
+                    docs[r.source_path]["committed"] = r.chunk_index + 1
+                stage.items += len(records)
+                records.clear()
+                vectors.clear()
+                stage.busy += time.perf_counter() - t0
+            self.checkpoint["sink"] = self.sink.state()
+            save_checkpoint(self.checkpoint_path, self.checkpoint)
+
+        while True:
+            item = self._get(self.vectors_queue)
+            if item is None:
+                break
+            if item[0] == "start":
+                _, key, entry = item
+                docs[key] = entry
+            elif item[0] == "end":
+                flush()
+                self.sink.finish_doc(item[1], docs[item[1]])
+                docs[item[1]]["done"] = True
+                save_checkpoint(self.checkpoint_path, self.checkpoint)
+                print(f"[OK] {Path(item[1]).name}: {docs[item[1]]['chunks']} chunks")
+            else:
+                records.append(item[0])
+                vectors.append(item[1])
+                if len(records) >= self.store_batch:
+                    flush()
+        flush()
+        # Sem nada novo desde o último fechamento, a coleção não é remontada
+        if not self.checkpoint["closed"]:
+            t0 = time.perf_counter()
+            self.sink.close({k: v for k, v in docs.items() if v.get("done")})
+            self.checkpoint["closed"] = True
+            save_checkpoint(self.checkpoint_path, self.checkpoint)
+            stage.busy += time.perf_counter() - t0
+
+    # -------------------------- Execução
+
+    def progress_line(self):
+        parts = []
+        for name, st in self.stages.items():
+            parts.append(f"{name}={st.items}")
+        for q in self.queues:
+            parts.append(f"fila {q.name}={q.queue.qsize()}/{q.queue.maxsize}")
+        return " | ".join(parts)
+
+    def run(self, pdfs, progress=0.0, sample_interval=0.05):
+        self.pdfs = list(pdfs)
+        self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        started = time.perf_counter()
+        threads = [
+            threading.Thread(target=self._run, args=(self.extract, self.stages["extract"]), daemon=True),
+            threading.Thread(target=self._run, args=(self.embed_stage, self.stages["embed"]), daemon=True),
+            threading.Thread(target=self._run, args=(self.store, self.stages["store"]), daemon=True),
+        ]
+        for t in threads:
+            t.start()
+
+        last_print = time.perf_counter()
+        while any(t.is_alive() for t in threads):
+            threads[-1].join(timeout=sample_interval)
+            for q in self.queues:
+                q.sample()
+            if progress and time.perf_counter() - last_print >= progress:
+                print(f"[..] {self.progress_line()}")
+                last_print = time.perf_counter()
+        for t in threads:
+            t.join()
+
+        elapsed = time.perf_counter() - started
+        return {
+            "seconds": elapsed,
+            "stages": {name: st.info() for name, st in self.stages.items()},
+            "queues": {q.name: q.info() for q in self.queues},
+            "errors": list(self.errors),
+        }
+
+
+def print_report(report):
+    print(f"Tempo total: {report['seconds']:.2f}s")
+    for name, st in report["stages"].items():
+        print(f"  {name:<8} {st['items']:>7} itens  {st['per_s']:>8.1f}/s  "
+              f"ocupado {st['busy_s']:.2f}s  bloqueado na saída {st['blocked_s']:.2f}s")
+    for name, q in report["queues"].items():
+        print(f"  fila {name:<8} média {q['avg']:.1f}/{q['maxsize']}  pico {q['peak']}")
+
+
+def make_sink(args):
+    if args.sink == "mongo":
+        from vectorStore import VectorStoreMongo
+
+        return MongoSink(VectorStoreMongo(), batch_size=args.store_batch)
+    from vectorIndex import LocalVectorStore
+
+    return LocalSink(
+        LocalVectorStore(), args.collection, Path(args.state_dir) / f"{args.collection}.spool",
+        nlist=args.nlist, dim=args.dim or None, dtype=args.dtype, keep_full=args.keep_full,
+    )
+
+
+def main():
+    from embedGenerate import EmbedGenerate
+
+    parser = argparse.ArgumentParser(description="Pipeline de ingestão: PDF -> chunks -> embeddings -> vector store.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    ingest = sub.add_parser("ingest", help="Extrai, chunkeia, embeda e grava os PDFs em estágios paralelos.")
+    ingest.add_argument("--input", required=True, help="Arquivo PDF ou pasta com PDFs.")
+    ingest.add_argument("--sink", default="local", choices=["local", "mongo"], help="Destino dos vetores.")
+    ingest.add_argument("--collection", default="default", help="Nome da coleção local (sink local).")
+    ingest.add_argument("--state-dir", default=os.getenv("INGEST_STATE_DIR", ".cache/ingest"),
+                        help="Pasta do checkpoint e do spool.")
+    ingest.add_argument("--restart", action="store_true", help="Ignora o checkpoint e ingere tudo de novo.")
+    ingest.add_argument("--prefer", default="pymupdf", choices=["pymupdf", "pdfminer"], help="Extrator preferido.")
+    ingest.add_argument("--max-chars", type=int, default=1200, help="Tamanho máximo de chunk.")
+    ingest.add_argument("--min-chars", type=int, default=400, help="Tamanho mínimo desejado para flush do buffer.")
+    ingest.add_argument("--overlap", type=int, default=150, help="Overlap (em caracteres) entre chunks.")
+    ingest.add_argument("--workers", type=int, default=2, help="Processos de extração.")
+    ingest.add_argument("--streaming", action="store_true", help="Extrai e chunkeia página a página.")
+    ingest.add_argument("--page-workers", type=int, default=1, help="Processos por PDF (faixas de páginas).")
+    ingest.add_argument("--page-timeout", type=float, default=0.0, help="Tempo máximo por página (0 = sem limite).")
+    ingest.add_argument("--page-cache", nargs="?", const=os.getenv("PAGE_CACHE_DIR", ".cache/pages"), default=None,
+                        help="Reaproveita páginas já extraídas e limpas (pasta opcional).")
+    ingest.add_argument("--embed-workers", type=int, default=4, help="Threads de embedding.")
+    ingest.add_argument("--embed-batch", type=int, default=64, help="Textos por chamada ao embedder.")
+    ingest.add_argument("--queue-size", type=int, default=256, help="Capacidade de cada fila entre estágios.")
+    ingest.add_argument("--store-batch", type=int, default=256, help="Chunks por gravação/checkpoint.")
+    ingest.add_argument("--progress", type=float, default=2.0, help="Intervalo do progresso em segundos (0 = desliga).")
+    ingest.add_argument("--nlist", type=int, default=0, help="Listas do IVF da coleção local.")
+    ingest.add_argument("--dim", type=int, default=0, help="Dimensão Matryoshka do índice local (0 = original).")
+    ingest.add_argument("--dtype", default="float32", choices=["float32", "float16", "int8"])
+    ingest.add_argument("--keep-full", action="store_true", help="Guarda os vetores em float32 para reordenar.")
+    args = parser.parse_args()
+
+    options = {
+        "prefer": args.prefer,
+        "max_chars": args.max_chars,
+        "min_chars": args.min_chars,
+        "overlap": args.overlap,
+    }
+    state_dir = Path(args.state_dir)
+    state_dir.mkdir(parents=True, exist_ok=True)
+    target = {"sink": args.sink, "collection": args.collection if args.sink == "local" else os.getenv("MONGO_COLLECTION")}
+
+    sink = make_sink(args)
+    embed = EmbedGenerate(batch_size=args.embed_batch, max_workers=args.embed_workers)
+    pipeline = IngestPipeline(
+        embed, sink, state_dir / f"{args.collection}.checkpoint.json", target, options,
+        workers=args.workers, streaming=args.streaming, queue_size=args.queue_size,
+        store_batch=args.store_batch, resume=not args.restart,
+        page_workers=args.page_workers, page_timeout=args.page_timeout, page_cache=args.page_cache,
+    )
+    pdfs = iter_pdf_files(Path(args.input).expanduser().resolve())
+    report = pipeline.run(pdfs, progress=args.progress)
+
+    for error in report["errors"]:
+        print(f"[ERRO] {error}", file=sys.stderr)
+    print("Concluído." if not report["errors"] else "Interrompido; rode de novo para continuar do checkpoint.")
+    print_report(report)
+    if report["errors"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+
+class LLMBusy(RuntimeError):
+    pass
+
+#Limita quantas chamadas ao LLM rodam ao mesmo tempo. Quem passa do limite espera na
+#fila; com a fila cheia a chamada é recusada (LLMBusy) em vez de acumular sem fim
+class LLMGate():
+    def __init__(self, max_concurrency=4, max_queue=64):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self.stats = {"in_flight": 0, "waiting": 0, "max_waiting": 0, "completed": 0,
+                      "rejected": 0, "wait_seconds": 0.0}
+
+    #Reserva uma vaga no LLM enquanto o bloco roda (inclusive durante um streaming inteiro)
+    @contextmanager
+    def slot(self):
+        with self._lock:
+            if self.stats["waiting"] >= self.max_queue:
+                self.stats["rejected"] += 1
+                raise LLMBusy("fila do LLM cheia")
+            self.stats["waiting"] += 1
+            self.stats["max_waiting"] = max(self.stats["max_waiting"], self.stats["waiting"])
+
+        started = time.perf_counter()
+        self._slots.acquire()
+        with self._lock:
+            self.stats["waiting"] -= 1
+            self.stats["in_flight"] += 1
+            self.stats["wait_seconds"] += time.perf_counter() - started
+        try:
+            yield
+        finally:
+            self._slots.release()
+            with self._lock:
+                self.stats["in_flight"] -= 1
+                self.stats["completed"] += 1
+
+    def call(self, fn, *args, **kwargs):
+        with self.slot():
+            return fn(*args, **kwargs)
+
+    #Versão para views async: a chamada bloqueante vai para uma thread e o loop fica livre
+    async def run(self, fn, *args, **kwargs):
+        return await asyncio.to_thread(self.call, fn, *args, **kwargs)
+
+    def info(self):
+        with self._lock:
+            done = self.stats["completed"]
+            return dict(self.stats, max_concurrency=self.max_concurrency,
+                        avg_wait_ms=self.stats["wait_seconds"] / done * 1000 if done else 0.0)
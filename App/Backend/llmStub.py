@@ -0,0 +1,95 @@
+import hashlib
+import threading
+import time
+
+#Cliente falso com a mesma forma do genai.Client (client.chats.create(...).send_message,
+#client.models.generate_content) para testes de carga sem rede nem custo de tokens.
+#A latência simula o tempo até a primeira resposta + o tempo por token gerado
+class StubResponse():
+    def __init__(self, text):
+        self.text = text
+
+
+class StubLLMClient():
+    def __init__(self, latency=0.3, per_token_latency=0.0, tokens=60):
+        self.latency = latency
+        self.per_token_latency = per_token_latency
+        self.tokens = tokens
+        self.chats = StubChats(self)
+        self.models = StubModels(self)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.active = 0
+        self.peak_active = 0
+
+    def words(self, prompt):
+        seed = hashlib.sha256(str(prompt).encode("utf-8")).hexdigest()
+        return [f"palavra{seed[i % len(seed)]}{i}" for i in range(self.tokens)]
+
+    def generate(self, prompt):
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+        try:
+            time.sleep(self.latency + self.per_token_latency * self.tokens)
+            return StubResponse(" ".join(self.words(prompt)))
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+    #Primeiro pedaço depois de latency, os demais a cada per_token_latency
+    def generate_stream(self, prompt):
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+        try:
+            time.sleep(self.latency)
+            for i, word in enumerate(self.words(prompt)):
+                if i:
+                    time.sleep(self.per_token_latency)
+                yield StubResponse(word if i == 0 else " " + word)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+class StubChat():
+    def __init__(self, client, model=None, config=None, history=None):
+        self.client = client
+        self.model = model
+        self.config = config
+        self.history = list(history or [])
+
+    def send_message(self, message):
+        response = self.client.generate(message)
+        self.history.extend([("user", message), ("model", response.text)])
+        return response
+
+    def send_message_stream(self, message):
+        parts = []
+        for chunk in self.client.generate_stream(message):
+            parts.append(chunk.text)
+            yield chunk
+        self.history.extend([("user", message), ("model", "".join(parts))])
+
+
+class StubChats():
+    def __init__(self, client):
+        self.client = client
+
+    def create(self, model=None, config=None, history=None):
+        return StubChat(self.client, model=model, config=config, history=history)
+
+
+class StubModels():
+    def __init__(self, client):
+        self.client = client
+
+    def generate_content(self, model=None, contents=None, config=None):
+        return self.client.generate(contents)
+
+    def generate_content_stream(self, model=None, contents=None, config=None):
+        return self.client.generate_stream(contents)
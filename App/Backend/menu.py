@@ -1,51 +1,177 @@
 import os
-from google import genai
-from google.genai import types
 from dotenv import load_dotenv
 from instructions import Instructions
 from ragGenerate import RagGenerate
+from answerCache import AnswerCache
+from streaming import StreamTiming, timed_stream
+from promptBuilder import PromptBuilder
+from chatHistory import CompactChat
 
 load_dotenv()
 
+try:
+    from google import genai
+    from google.genai import types
+except Exception:
+    genai = None
+    types = None
+
 class Menu():
-    def __init__(self):
-        self.client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
-        self.client.chats.create
-        self.chat = self.client.chats.create(model="gemma-3-27b-it", 
-                                             config= types.GenerateContentConfig(
-                                                 temperature=0.1,
-                                                 #top_p=1,
-                                                 #max_output_tokens=200,
-                                                 #top_k=,
-                                                 stop_sequences=[]))
+    #client, answers e recovery podem ser compartilhados entre sessões (api.py); cada Menu
+    #tem o seu próprio chat. gate limita as chamadas simultâneas ao LLM (llmGate.py)
+    def __init__(self, client=None, answers=None, recovery=None, gate=None):
+        self.client = client if client is not None else self.make_client()
+        config = None
+        if types is not None:
+            config = types.GenerateContentConfig(
+                temperature=0.1,
+                #top_p=1,
+                #max_output_tokens=200,
+                #top_k=,
+                stop_sequences=[])
         self.instructions = Instructions()
-        self.recovery = RagGenerate()
+        #Histórico com janela deslizante + resumo (CHAT_HISTORY_WINDOW); a persona vai no
+        #cabeçalho fixo do CompactChat e o contexto do RAG não fica no histórico
+        self.chat = CompactChat(self.client, model="gemma-3-27b-it", config=config,
+                                system_text=self.instructions.get_instructions("04") + "\n" + self.instructions.get_instructions("01"))
+        self.gate = gate
+        self.last_timing = None
+        self.recovery = recovery if recovery is not None else RagGenerate()
         self.collection_name = "Chunk_Static_CH500_OV50"
+        #Perguntas repetidas (ou muito parecidas) respondem do cache, sem embedding/busca/LLM.
+        #O cache é compartilhado entre sessões e a chave não inclui a conversa, então só vale
+        #para a primeira pergunta (ver use_answer_cache)
+        self.answers = answers if answers is not None else AnswerCache()
+        #Contexto dentro do orçamento de tokens (a persona já vai pelo CompactChat)
+        self.prompts = PromptBuilder("")
+        self.last_prompt_stats = None
 
-    def post_message_norag(self, question):
-        full_prompt = f"""
-            {self.instructions.get_instructions("04")}
-            {self.instructions.get_instructions("01")}
-            Pergunta: {question}
-            """
-        return self.chat.send_message(full_prompt).text
+    @staticmethod
+    def make_client():
+        return genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
 
-    def post_message_rag(self, question):
-        relevant_docs = self.recovery.compair_vector(question, self.collection_name)
+    #history_text é o que fica no histórico do chat (a pergunta, sem o contexto do RAG)
+    def send(self, prompt, history_text=None):
+        if self.gate is not None:
+            answer = self.gate.call(self.chat.send_message, prompt, history_text).text
+        else:
+            answer = self.chat.send_message(prompt, history_text).text
+        self.prompts.mark_sent()
+        self.record_request_stats()
+        return answer
+
+    #Mesma chamada, devolvendo os pedaços da resposta à medida que chegam
+    def send_stream(self, prompt, history_text=None):
+        if self.gate is not None:
+            with self.gate.slot():
+                yield from self.chat.send_message_stream(prompt, history_text)
+        else:
+            yield from self.chat.send_message_stream(prompt, history_text)
+        self.prompts.mark_sent()
+        self.record_request_stats()
+
+    #Acrescenta aos tokens do turno o tamanho real da requisição (persona + resumo + janela)
+    def record_request_stats(self):
+        if self.last_prompt_stats is not None and self.chat.last_stats is not None:
+            self.last_prompt_stats.update(self.chat.last_stats)
+
+    #Com histórico a resposta depende da conversa ("pode explicar melhor?"), e a de outra
+    #sessão não serve: nem consulta nem grava no cache
+    def use_answer_cache(self):
+        return self.chat.turn_count == 0
 
-        context_text = ""
+    #Resposta do cache entra no histórico como se viesse do modelo: as perguntas seguintes
+    #têm o contexto e já não usam o cache
+    def cached_answer(self, question, scope, embed=None):
+        if not self.use_answer_cache():
+            return None, None
+        answer, query = self.answers.get(question, scope, embed=embed)
+        if answer is not None:
+            self.chat.record(f"Pergunta: {question}", answer)
+        return answer, query
+
+    def store_answer(self, question, scope, answer, vector=None, cacheable=True):
+        if cacheable:
+            self.answers.put(question, scope, answer, vector=vector)
+
+    def norag_prompt(self, question):
+        prompt = self.prompts.build(question)
+        self.last_prompt_stats = self.prompts.last_stats
+        return prompt
+
+    def rag_prompt(self, question, query=None):
+        relevant_docs = self.recovery.compair_vector(question, self.collection_name, query=query)
+
+        documents = []
         if 'documents' in relevant_docs and relevant_docs['documents']:
             for doc_list in relevant_docs['documents']:
-                for doc in doc_list:
-                    context_text += f"{doc}\n\n"
-
-        full_prompt = f"""
-            {self.instructions.get_instructions("04")}
-            {self.instructions.get_instructions("01")}
-            Responda com base nas seguintes informações:
-            {context_text} 
-            Se as informações não tiverem relação com a pergunta a seguir, desconsidere o uso delas.
-            Pergunta: {question}
-            """
-        
-        return self.chat.send_message(full_prompt).text
+                documents.extend(doc_list)
+
+        prompt = self.prompts.build(question, documents)
+        self.last_prompt_stats = self.prompts.last_stats
+        return prompt
+
+    def post_message_norag(self, question):
+        self.last_prompt_stats = None
+        scope = ("04", "01", "norag")
+        cacheable = self.use_answer_cache()
+        answer, _ = self.cached_answer(question, scope)
+        if answer is not None:
+            return answer
+
+        answer = self.send(self.norag_prompt(question), f"Pergunta: {question}")
+        self.store_answer(question, scope, answer, cacheable=cacheable)
+        return answer
+
+    def post_message_rag(self, question):
+        self.last_prompt_stats = None
+        scope = ("04", "01", self.collection_name)
+        cacheable = self.use_answer_cache()
+        answer, query = self.cached_answer(question, scope, embed=lambda: self.recovery.embed_question(question))
+        if answer is not None:
+            return answer
+
+        answer = self.send(self.rag_prompt(question, query), f"Pergunta: {question}")
+        self.store_answer(question, scope, answer, vector=query, cacheable=cacheable)
+        return answer
+
+    #Versões em streaming: geradores de pedaços de texto. Os tempos (TTFT e total) ficam
+    #em timing (ou em self.last_timing)
+    def stream_message_norag(self, question, timing=None):
+        timing = self.last_timing = timing or StreamTiming()
+        self.last_prompt_stats = None
+        scope = ("04", "01", "norag")
+        cacheable = self.use_answer_cache()
+        answer, _ = self.cached_answer(question, scope)
+        if answer is not None:
+            yield from timed_stream([answer], timing)
+            return
+
+        parts = []
+        for text in timed_stream(self.send_stream(self.norag_prompt(question), f"Pergunta: {question}"), timing):
+            parts.append(text)
+            yield text
+        self.store_answer(question, scope, "".join(parts), cacheable=cacheable)
+
+    def stream_message_rag(self, question, timing=None):
+        timing = self.last_timing = timing or StreamTiming()
+        self.last_prompt_stats = None
+        scope = ("04", "01", self.collection_name)
+        cacheable = self.use_answer_cache()
+        answer, query = self.cached_answer(question, scope, embed=lambda: self.recovery.embed_question(question))
+        if answer is not None:
+            yield from timed_stream([answer], timing)
+            return
+
+        parts = []
+        for text in timed_stream(self.send_stream(self.rag_prompt(question, query), f"Pergunta: {question}"), timing):
+            parts.append(text)
+            yield text
+        self.store_answer(question, scope, "".join(parts), vector=query, cacheable=cacheable)
+
+    def cache_stats(self):
+        return self.answers.info()
+
+    #Tokens do prompt em cada turno enviado ao LLM (persona, contexto, pergunta, total)
+    def prompt_stats(self):
+        return list(self.prompts.turns)
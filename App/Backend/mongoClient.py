@@ -0,0 +1,40 @@
+import os
+import threading
+from pymongo import MongoClient
+from pymongo.server_api import ServerApi
+from dotenv import load_dotenv
+
+load_dotenv()
+
+#Coleção com o contador de ingestões de cada coleção de vetores ({_id: nome, generation: n})
+GENERATIONS_COLLECTION = 'ingest_generations'
+
+#Um MongoClient por endereço para o processo inteiro. O MongoClient já mantém um
+#pool de conexões thread-safe; criar um por classe/script só multiplica conexões
+_clients = {}
+_lock = threading.Lock()
+
+def get_mongo_client(address=None):
+    address = address or os.getenv("MONGO_ADDRESS")
+    with _lock:
+        client = _clients.get(address)
+        if client is None:
+            client = MongoClient(
+                address,
+                server_api=ServerApi('1'),
+                maxPoolSize=int(os.getenv("MONGO_MAX_POOL", "50")),
+            )
+            _clients[address] = client
+        return client
+
+#Permite registrar um cliente já pronto (ex.: mongomock.MongoClient() nos testes)
+def set_mongo_client(client, address=None):
+    address = address or os.getenv("MONGO_ADDRESS")
+    with _lock:
+        _clients[address] = client
+
+def close_mongo_clients():
+    with _lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
@@ -0,0 +1,108 @@
+import os
+import struct
+import tempfile
+import zlib
+from pathlib import Path
+
+#Cache de páginas já extraídas e limpas, endereçado pelo conteúdo: a chave é o SHA-1
+#do PDF + o extrator/versões do código de extração e limpeza (tag). Rechunkear com
+#outros --max-chars/--min-chars/--overlap lê daqui em vez de reabrir o PDF.
+#Formato: cabeçalho MAGIC e um stream zlib de registros (uint32 tamanho + texto UTF-8),
+#gravado e lido página a página, sem montar o documento inteiro na memória
+
+MAGIC = b"PGC1"
+_length = struct.Struct("<I")
+
+
+class PageCache():
+    def __init__(self, base_dir=None, level=6):
+        self.base_dir = Path(base_dir or os.getenv("PAGE_CACHE_DIR", ".cache/pages"))
+        self.level = level
+        self.hits = 0
+        self.misses = 0
+
+    def path_for(self, sha1: str, tag: str) -> Path:
+        return self.base_dir / sha1[:2] / f"{sha1}.{tag}.pages"
+
+    def has(self, sha1: str, tag: str) -> bool:
+        return self.path_for(sha1, tag).is_file()
+
+    def iter_pages(self, sha1: str, tag: str, block_size: int = 1 << 16):
+        path = self.path_for(sha1, tag)
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"cache de páginas inválido: {path}")
+            decomp = zlib.decompressobj()
+            buf = b""
+            for block in iter(lambda: f.read(block_size), b""):
+                buf += decomp.decompress(block)
+                pos = 0
+                while len(buf) - pos >= _length.size:
+                    (size,) = _length.unpack_from(buf, pos)
+                    end = pos + _length.size + size
+                    if end > len(buf):
+                        break
+                    yield buf[pos + _length.size:end].decode("utf-8")
+                    pos = end
+                buf = buf[pos:]
+            if buf or not decomp.eof:
+                raise ValueError(f"cache de páginas truncado: {path}")
+
+    #Lê a entrada inteira sem guardar as páginas; uma entrada corrompida ou truncada
+    #é apagada e conta como ausente (o modo streaming só pode confiar no cache depois disso)
+    def valid(self, sha1: str, tag: str) -> bool:
+        if not self.has(sha1, tag):
+            return False
+        try:
+            for _ in self.iter_pages(sha1, tag):
+                pass
+        except (OSError, ValueError, zlib.error):
+            self.path_for(sha1, tag).unlink(missing_ok=True)
+            return False
+        return True
+
+    #Lista de páginas ou None se não está no cache (arquivo corrompido conta como ausente)
+    def get(self, sha1: str, tag: str):
+        if not self.has(sha1, tag):
+            self.misses += 1
+            return None
+        try:
+            pages = list(self.iter_pages(sha1, tag))
+        except (OSError, ValueError, zlib.error):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return pages
+
+    def put(self, sha1: str, tag: str, pages):
+        for _ in self.cache_pages(sha1, tag, pages):
+            pass
+
+    #Repassa as páginas adiante enquanto grava; o arquivo só aparece no cache
+    #se o iterável chegar ao fim (uma extração interrompida não deixa entrada parcial)
+    def cache_pages(self, sha1: str, tag: str, pages):
+        path = self.path_for(sha1, tag)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=path.parent)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(MAGIC)
+                comp = zlib.compressobj(self.level)
+                for page in pages:
+                    data = page.encode("utf-8")
+                    f.write(comp.compress(_length.pack(len(data)) + data))
+                    yield page
+                f.write(comp.flush())
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def info(self):
+        files = list(self.base_dir.rglob("*.pages")) if self.base_dir.is_dir() else []
+        return {
+            "entries": len(files),
+            "bytes": sum(p.stat().st_size for p in files),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
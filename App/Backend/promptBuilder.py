@@ -0,0 +1,139 @@
+import os
+import re
+
+#Monta os prompts do tutor dentro de um orçamento de tokens:
+#- persona/instrução vão só na primeira mensagem da sessão (o chat já guarda o histórico);
+#- chunks recuperados entram em ordem de relevância, sem repetir trechos sobrepostos
+#  (o chunker dinâmico gera muita sobreposição) e os menos relevantes saem primeiro
+#  quando o orçamento acaba.
+
+_word_boundary = re.compile(r"\s+\S*$")
+
+
+#Estimativa sem tokenizador (~4 caracteres por token); count_tokens do genai pode ser
+#passado como counter quando a contagem exata compensar a ida à rede
+def estimate_tokens(text: str) -> int:
+    return (len(text) + 3) // 4
+
+
+#Tamanho do maior sufixo de a que é prefixo de b (ao menos min_overlap caracteres)
+def overlap_length(a: str, b: str, min_overlap: int = 40) -> int:
+    if len(a) < min_overlap or len(b) < min_overlap:
+        return 0
+    probe = b[:min_overlap]
+    start = max(0, len(a) - len(b))
+    best = 0
+    pos = a.find(probe, start)
+    while pos != -1:
+        size = len(a) - pos
+        if b.startswith(a[pos:]):
+            best = size
+            break
+        pos = a.find(probe, pos + 1)
+    return best
+
+
+#Remove chunks contidos em outros já escolhidos e corta de cada chunk o trecho que
+#repete o começo/fim de um anterior. A ordem (relevância) é mantida
+def dedupe_chunks(chunks, min_overlap: int = 40):
+    kept = []
+    removed = 0
+    for chunk in chunks:
+        text = chunk.strip()
+        if not text:
+            continue
+        if any(text in other for other in kept):
+            removed += 1
+            continue
+        for other in kept:
+            head = overlap_length(other, text, min_overlap)
+            if head:
+                text = text[head:].lstrip()
+            tail = overlap_length(text, other, min_overlap)
+            if tail:
+                text = text[:len(text) - tail].rstrip()
+        if len(text) < min_overlap:
+            removed += 1
+            continue
+        kept.append(text)
+    return kept, removed
+
+
+def truncate_to_tokens(text: str, max_tokens: int, counter=estimate_tokens) -> str:
+    if max_tokens <= 0:
+        return ""
+    if counter(text) <= max_tokens:
+        return text
+    cut = int(len(text) * max_tokens / counter(text))
+    while cut > 0 and counter(text[:cut]) > max_tokens:
+        cut = int(cut * 0.9)
+    piece = _word_boundary.sub("", text[:cut]) or text[:cut]
+    return piece + " ..."
+
+
+class PromptBuilder():
+    #system_text: persona + instrução, enviada uma única vez por sessão
+    def __init__(self, system_text: str, budget=None, counter=None, min_overlap: int = 40, min_chunk_tokens: int = 40):
+        self.system_text = system_text.strip()
+        self.budget = budget or int(os.getenv("PROMPT_TOKEN_BUDGET", "2000"))
+        self.counter = counter or estimate_tokens
+        self.min_overlap = min_overlap
+        self.min_chunk_tokens = min_chunk_tokens
+        self.system_sent = False
+        self.turns = []
+        self.last_stats = None
+        self.last_context = []
+
+    #Chamado depois que a mensagem foi aceita pelo chat: daí em diante a persona não é reenviada
+    def mark_sent(self):
+        self.system_sent = True
+
+    def select_context(self, documents, max_tokens):
+        chunks, removed = dedupe_chunks(documents or [], self.min_overlap)
+        selected = []
+        used = 0
+        for chunk in chunks:
+            remaining = max_tokens - used
+            cost = self.counter(chunk)
+            if cost <= remaining:
+                selected.append(chunk)
+                used += cost
+                continue
+            if remaining >= self.min_chunk_tokens:
+                piece = truncate_to_tokens(chunk, remaining, self.counter)
+                selected.append(piece)
+                used += self.counter(piece)
+            break
+        return selected, removed, len(chunks) - len(selected)
+
+    #documents em ordem de relevância; None = pergunta sem RAG
+    def build(self, question: str, documents=None) -> str:
+        header = self.system_text if not self.system_sent else ""
+        question_part = f"Pergunta: {question}"
+        fixed = [header, question_part]
+        context_part = ""
+        selected, removed, dropped = [], 0, 0
+
+        if documents is not None:
+            intro = "Responda com base nas seguintes informações:"
+            outro = "Se as informações não tiverem relação com a pergunta a seguir, desconsidere o uso delas."
+            room = self.budget - sum(self.counter(p) for p in fixed + [intro, outro])
+            selected, removed, dropped = self.select_context(documents, room)
+            context_part = "\n\n".join([intro] + selected + [outro]) if selected else ""
+
+        prompt = "\n\n".join(p for p in (header, context_part, question_part) if p)
+        stats = {
+            "turn": len(self.turns) + 1,
+            "system_tokens": self.counter(header) if header else 0,
+            "context_tokens": sum(self.counter(c) for c in selected),
+            "question_tokens": self.counter(question_part),
+            "prompt_tokens": self.counter(prompt),
+            "chunks_in": len(documents or []),
+            "chunks_used": len(selected),
+            "chunks_deduplicated": removed,
+            "chunks_dropped": dropped,
+        }
+        self.turns.append(stats)
+        self.last_stats = stats
+        self.last_context = selected
+        return prompt
@@ -1,15 +1,74 @@
-from vectorStore import VectorStore
+import os
+from vectorIndex import LocalVectorStore
 from embedGenerate import EmbedGenerate
+from ttlCache import TTLCache, normalize_question
+from hybridSearch import HybridRetriever
+from reranker import get_reranker
 
 #Classe utilizada para juntar as funcionalidades do RAG e pronta para ser chamada
 class RagGenerate():
-    def __init__(self):
-        self.vector_store = VectorStore()
-        self.embed = EmbedGenerate()
-    
-    #Método que mescla o armazenamento vetorial e o embedder
-    def compair_vector(self, question: str, collection_name):
-        query = self.embed.embed_query(question)
-        
-        return self.vector_store.collection_query(query, collection_name)
-    
\ No newline at end of file
+    #vector_store é qualquer objeto com collection_query(query, collection_name); por padrão
+    #usa o índice local (vectorIndex.py), sem ida à rede para buscar os chunks.
+    #Com RAG_HYBRID=1 os resultados são fundidos com o BM25 da coleção (hybridSearch.py)
+    #reranker (reranker.py, ou RAG_RERANK=lexical|cross-encoder): busca `candidates` chunks
+    #e só os top_n reordenados seguem para o prompt
+    def __init__(self, vector_store=None, embed=None, k=8, cache_size=512, cache_ttl=None, reranker=None, candidates=None):
+        self.vector_store = vector_store if vector_store is not None else LocalVectorStore()
+        if vector_store is None and os.getenv("RAG_HYBRID", "0") == "1":
+            self.vector_store = HybridRetriever(self.vector_store)
+        self.embed = embed if embed is not None else EmbedGenerate()
+        self.k = k
+        self.reranker = reranker if reranker is not None else get_reranker()
+        self.candidates = candidates or int(os.getenv("RAG_CANDIDATES", "20"))
+        #Perguntas repetidas na mesma sessão não refazem embedding nem busca
+        cache_ttl = cache_ttl if cache_ttl is not None else float(os.getenv("RAG_CACHE_TTL", "3600"))
+        self.query_cache = TTLCache(max_entries=cache_size, ttl=cache_ttl)
+        self.result_cache = TTLCache(max_entries=cache_size, ttl=cache_ttl)
+
+    #Embedding da pergunta no formato aceito por collection_query ([vetor])
+    def embed_question(self, question: str):
+        key = normalize_question(question)
+        query = self.query_cache.get(key)
+        if query is None:
+            query = self.embed.embed_query(question)
+            self.query_cache.put(key, query)
+        return query
+
+    #Versão/geração da coleção quando o vector store informa (LocalVectorStore, VectorSearchService);
+    #entra na chave do cache, então uma re-ingestão nunca devolve contexto antigo
+    def collection_version(self, collection_name):
+        version = getattr(self.vector_store, 'collection_version', None)
+        return version(collection_name) if version is not None else None
+
+    #Método que mescla o armazenamento vetorial e o embedder; query permite reaproveitar
+    #um embedding já calculado para a mesma pergunta
+    def compair_vector(self, question: str, collection_name, query=None, k=None):
+        k = k or self.k
+        rerank = self.reranker.name if self.reranker is not None else None
+        key = (normalize_question(question), collection_name, k, rerank, self.collection_version(collection_name))
+        result = self.result_cache.get(key)
+        if result is not None:
+            return result
+
+        if query is None:
+            query = self.embed_question(question)
+
+        search_k = max(k, self.candidates) if self.reranker is not None else k
+        if getattr(self.vector_store, 'uses_question', False):
+            result = self.vector_store.collection_query(query, collection_name, k=search_k, question=question)
+        else:
+            result = self.vector_store.collection_query(query, collection_name, k=search_k)
+
+        if self.reranker is not None:
+            result, reranked = self.reranker.rerank(question, result)
+            #Resultado na ordem original (estouro de tempo) não vai para o cache
+            if not reranked:
+                return result
+        self.result_cache.put(key, result)
+        return result
+
+    def cache_stats(self):
+        stats = {"queries": self.query_cache.stats, "results": self.result_cache.stats}
+        if self.reranker is not None:
+            stats["reranker"] = dict(self.reranker.stats)
+        return stats
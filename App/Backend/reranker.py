@@ -0,0 +1,140 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from bm25Index import tokenize
+
+try:
+    from sentence_transformers import CrossEncoder
+except Exception:
+    CrossEncoder = None
+
+#Reordenação dos chunks recuperados antes de montar o prompt. Um scorer é qualquer
+#função (pergunta, documentos) -> pontuações (maior = mais relevante)
+
+#Scorer barato e determinístico: fração dos termos da pergunta presentes no chunk,
+#com desempate pela densidade desses termos
+class LexicalOverlapScorer():
+    name = "lexical"
+
+    def __call__(self, question, documents):
+        terms = set(tokenize(question))
+        if not terms:
+            return [0.0] * len(documents)
+        scores = []
+        for doc in documents:
+            tokens = tokenize(doc)
+            hits = sum(1 for t in tokens if t in terms)
+            scores.append(len(terms & set(tokens)) / len(terms) + hits / (len(tokens) + 1) * 0.1)
+        return scores
+
+
+#Cross-encoder local (sentence-transformers); o modelo é carregado uma vez por processo
+class CrossEncoderScorer():
+    _models = {}
+    _models_lock = threading.Lock()
+
+    def __init__(self, model='cross-encoder/mmarco-mMiniLMv2-L12-H384-v1', device='cpu', batch_size=16):
+        if CrossEncoder is None:
+            raise RuntimeError("pacote sentence-transformers não instalado")
+        self.model_name = model
+        self.device = device
+        self.batch_size = batch_size
+        self.name = f"cross-encoder:{model}"
+
+    def _model(self):
+        key = (self.model_name, self.device)
+        with CrossEncoderScorer._models_lock:
+            if key not in CrossEncoderScorer._models:
+                CrossEncoderScorer._models[key] = CrossEncoder(self.model_name, device=self.device)
+            return CrossEncoderScorer._models[key]
+
+    def warm_up(self):
+        self._model()
+        return self
+
+    def __call__(self, question, documents):
+        pairs = [(question, doc) for doc in documents]
+        return [float(s) for s in self._model().predict(pairs, batch_size=self.batch_size)]
+
+
+#Aplica o scorer com um limite de tempo por pergunta; se estourar (ou o scorer falhar)
+#mantém a ordem original da busca. Em ambos os casos devolve só os top_n chunks.
+#Um scorer que estourou o tempo continua rodando até o fim (não dá para interromper a
+#thread), então o trabalho pendente é limitado ao tamanho do pool: com todas as vagas
+#ocupadas a pergunta segue sem reordenar, em vez de entrar na fila atrás dos lentos
+class Reranker():
+    _max_workers = 2
+    _executor = ThreadPoolExecutor(max_workers=_max_workers)
+    _slots = threading.BoundedSemaphore(_max_workers)
+
+    def __init__(self, scorer, top_n=4, time_budget=0.25):
+        self.scorer = scorer
+        self.top_n = top_n
+        self.time_budget = time_budget
+        self.name = f"{getattr(scorer, 'name', 'scorer')}:{top_n}"
+        self._lock = threading.Lock()
+        self.stats = {"reranked": 0, "fallbacks": 0, "saturated": 0, "seconds": 0.0}
+
+    #Roda no pool; a vaga é liberada só quando o scorer termina. Se o prazo da pergunta
+    #já passou (ficou esperando), nem chama o scorer
+    def _score(self, question, documents, deadline):
+        try:
+            if time.perf_counter() >= deadline:
+                return None
+            return self.scorer(question, documents)
+        finally:
+            Reranker._slots.release()
+
+    #result no formato de collection_query (uma lista por pergunta; só a primeira é usada).
+    #Devolve (resultado, True se reordenou / False se caiu na ordem original)
+    def rerank(self, question, result):
+        documents = result["documents"][0] if result.get("documents") else []
+        started = time.perf_counter()
+        order = None
+        saturated = False
+        if documents:
+            if Reranker._slots.acquire(blocking=False):
+                try:
+                    future = Reranker._executor.submit(self._score, question, documents,
+                                                       started + self.time_budget)
+                except Exception:
+                    Reranker._slots.release()
+                    raise
+                try:
+                    scores = future.result(timeout=self.time_budget)
+                    if scores is not None:
+                        order = sorted(range(len(documents)), key=lambda i: scores[i], reverse=True)
+                except FutureTimeout:
+                    #Sem cancel(): um job cancelado na fila nunca rodaria o _score e a vaga
+                    #não voltaria; atrasado, ele mesmo pula o scorer e libera a vaga
+                    pass
+                except Exception:
+                    pass
+            else:
+                saturated = True
+
+        with self._lock:
+            self.stats["seconds"] += time.perf_counter() - started
+            self.stats["reranked" if order is not None else "fallbacks"] += 1
+            if saturated:
+                self.stats["saturated"] += 1
+
+        keep = (order or list(range(len(documents))))[:self.top_n]
+        reranked = {key: [[values[0][i] for i in keep]] if values else values for key, values in result.items()}
+        return reranked, order is not None
+
+
+def get_reranker(name=None):
+    name = name or os.getenv("RAG_RERANK", "")
+    top_n = int(os.getenv("RAG_RERANK_TOP", "4"))
+    budget = float(os.getenv("RAG_RERANK_BUDGET", "0.25"))
+    if not name:
+        return None
+    if name == "lexical":
+        return Reranker(LexicalOverlapScorer(), top_n=top_n, time_budget=budget)
+    if name == "cross-encoder":
+        return Reranker(CrossEncoderScorer().warm_up(), top_n=top_n, time_budget=budget)
+    raise ValueError(f"reranker desconhecido: {name}")
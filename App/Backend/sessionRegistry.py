@@ -0,0 +1,61 @@
+import threading
+import time
+import uuid
+
+class Session():
+    def __init__(self, session_id, menu):
+        self.session_id = session_id
+        self.menu = menu
+        #Uma mensagem por vez por sessão: o histórico do chat não intercala respostas
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+
+
+#Uma conversa (Menu com seu próprio chat) por session id. Sessões paradas há mais de
+#idle_ttl segundos são descartadas; acima de max_sessions sai a menos usada recentemente
+class SessionRegistry():
+    def __init__(self, factory, idle_ttl=1800.0, max_sessions=1000):
+        self.factory = factory
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max_sessions
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self.created = 0
+        self.evicted = 0
+
+    def get(self, session_id=None):
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            session = self._sessions.get(session_id) if session_id else None
+            if session is None:
+                session_id = session_id or uuid.uuid4().hex
+                session = Session(session_id, self.factory())
+                self._sessions[session_id] = session
+                self.created += 1
+                if len(self._sessions) > self.max_sessions:
+                    oldest = min(self._sessions.values(), key=lambda s: s.last_used)
+                    del self._sessions[oldest.session_id]
+                    self.evicted += 1
+            session.last_used = now
+            return session
+
+    def drop(self, session_id):
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def _evict_idle(self, now):
+        idle = [sid for sid, s in self._sessions.items() if now - s.last_used > self.idle_ttl]
+        for sid in idle:
+            del self._sessions[sid]
+        self.evicted += len(idle)
+
+    def evict_idle(self):
+        with self._lock:
+            self._evict_idle(time.monotonic())
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def info(self):
+        return {"active": len(self._sessions), "created": self.created, "evicted": self.evicted}
@@ -0,0 +1,61 @@
+import json
+import threading
+import time
+
+#Tempo até o primeiro token (TTFT) e tempo total de uma resposta em streaming,
+#contados a partir da criação (antes do embedding/busca, quando houver)
+class StreamTiming():
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.first_token = None
+        self.total = None
+        self.chunks = 0
+
+    def info(self):
+        return {
+            "ttft_ms": self.first_token * 1000 if self.first_token is not None else None,
+            "total_ms": self.total * 1000 if self.total is not None else None,
+            "chunks": self.chunks,
+        }
+
+
+#Repassa os pedaços de texto (objetos com .text do genai ou strings) marcando os tempos
+def timed_stream(chunks, timing):
+    for chunk in chunks:
+        text = getattr(chunk, "text", chunk)
+        if not text:
+            continue
+        if timing.first_token is None:
+            timing.first_token = time.perf_counter() - timing.started
+        timing.chunks += 1
+        yield text
+    timing.total = time.perf_counter() - timing.started
+
+
+def sse_event(data, event=None):
+    head = f"event: {event}\n" if event else ""
+    return f"{head}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+#Agregado dos tempos das respostas em streaming (exposto em /metrics)
+class StreamStats():
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.ttft_seconds = 0.0
+        self.total_seconds = 0.0
+
+    def record(self, timing):
+        if timing.total is None:
+            return
+        with self._lock:
+            self.count += 1
+            self.ttft_seconds += timing.first_token or timing.total
+            self.total_seconds += timing.total
+
+    def info(self):
+        with self._lock:
+            if not self.count:
+                return {"streams": 0, "avg_ttft_ms": None, "avg_total_ms": None}
+            return {"streams": self.count, "avg_ttft_ms": self.ttft_seconds / self.count * 1000,
+                    "avg_total_ms": self.total_seconds / self.count * 1000}
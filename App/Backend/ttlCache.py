@@ -0,0 +1,73 @@
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+#Cache em memória com limite de entradas (LRU) e tempo de vida (TTL) por entrada
+class TTLCache():
+    def __init__(self, max_entries=1024, ttl=3600.0, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expired(self, stored_at):
+        return self.ttl is not None and self.clock() - stored_at > self.ttl
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or self._expired(item[1]):
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (value, self.clock())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            item = self._data.pop(key, None)
+            return default if item is None else item[0]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    #Cópia das entradas ainda válidas (as vencidas são descartadas aqui)
+    def items(self):
+        with self._lock:
+            for key in [k for k, (_, t) in self._data.items() if self._expired(t)]:
+                del self._data[key]
+            return [(k, v) for k, (v, _) in self._data.items()]
+
+    def __len__(self):
+        return len(self._data)
+
+    @property
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._data)}
+
+
+_question_noise = re.compile(r"[^\w\s]+")
+_question_space = re.compile(r"\s+")
+
+
+#"O que é Sinapse?" e "o que e sinapse" viram a mesma chave
+def normalize_question(question: str) -> str:
+    folded = unicodedata.normalize("NFKD", question.lower())
+    folded = "".join(c for c in folded if not unicodedata.combining(c))
+    folded = _question_noise.sub(" ", folded)
+    return _question_space.sub(" ", folded).strip()
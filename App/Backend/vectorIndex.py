@@ -0,0 +1,377 @@
+import argparse
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from chunkStore import ChunkStore
+from vectorQuant import matryoshka, quantize
+
+#Índice vetorial embutido no processo (alternativa ao $vectorSearch do MongoDB).
+#Os vetores ficam normalizados em uma matriz float32 contígua, então o cosseno é
+#só um produto escalar.
+
+
+def normalize_rows(vectors):
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def top_k(scores, k):
+    #argpartition acha os k maiores em O(n) e só eles são ordenados
+    k = min(k, scores.shape[-1])
+    if k <= 0:
+        empty = np.empty(scores.shape[:-1] + (0,), dtype=np.int64)
+        return np.empty(empty.shape, dtype=np.float32), empty
+    idx = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    part = np.take_along_axis(scores, idx, axis=-1)
+    order = np.argsort(-part, axis=-1, kind="stable")
+    return np.take_along_axis(part, order, axis=-1), np.take_along_axis(idx, order, axis=-1)
+
+
+#Busca exata: produto de matrizes em blocos de linhas + argpartition. Os vetores podem
+#estar em float16 ou int8 (com scales por linha, ver vectorQuant.py); nesse caso cada
+#bloco vira uma cópia float32 por pergunta, então o bloco é bem menor (cabe no cache)
+BLOCK_ROWS = 65536
+QUANT_BLOCK_ROWS = 4096
+
+
+class FlatIndex():
+    def __init__(self, vectors, block_rows=None, scales=None):
+        self.vectors = vectors
+        if block_rows is None:
+            block_rows = BLOCK_ROWS if vectors.dtype == np.float32 else QUANT_BLOCK_ROWS
+        self.block_rows = block_rows
+        self.scales = scales
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    @property
+    def dim(self):
+        return self.vectors.shape[1]
+
+    #Produto das perguntas pelas linhas [start, stop), convertendo o bloco para float32
+    def block_scores(self, start, stop, queries):
+        block = np.asarray(self.vectors[start:stop])
+        if block.dtype != np.float32:
+            block = block.astype(np.float32)
+        scores = queries @ block.T
+        if self.scales is not None:
+            scores *= self.scales[start:stop]
+        return scores
+
+    def search_exact(self, queries, k=8):
+        queries = normalize_rows(queries)
+        n = len(self)
+        best_scores = np.full((queries.shape[0], 0), -np.inf, dtype=np.float32)
+        best_rows = np.empty((queries.shape[0], 0), dtype=np.int64)
+        for start in range(0, n, self.block_rows):
+            scores, rows = top_k(self.block_scores(start, start + self.block_rows, queries), k)
+            best_scores = np.concatenate([best_scores, scores], axis=1)
+            best_rows = np.concatenate([best_rows, rows + start], axis=1)
+            if best_scores.shape[1] > k:
+                best_scores, keep = top_k(best_scores, k)
+                best_rows = np.take_along_axis(best_rows, keep, axis=1)
+        return best_scores, best_rows
+
+    def search(self, queries, k=8, **kwargs):
+        return self.search_exact(queries, k)
+
+
+#IVF: k-means esférico agrupa os vetores em nlist listas; a busca só olha as nprobe
+#listas cujos centróides são mais parecidos com a pergunta. Os vetores ficam
+#reordenados por lista, então cada lista é uma fatia contígua da matriz
+class IVFIndex(FlatIndex):
+    def __init__(self, vectors, centroids, list_offsets, nprobe=8, block_rows=None, scales=None):
+        super().__init__(vectors, block_rows=block_rows, scales=scales)
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.list_offsets = np.asarray(list_offsets, dtype=np.int64)
+        self.nprobe = nprobe
+
+    @staticmethod
+    def train(vectors, nlist, iterations=10, sample=100_000, seed=0):
+        rng = np.random.default_rng(seed)
+        n = vectors.shape[0]
+        train = vectors[rng.choice(n, size=min(n, sample), replace=False)]
+        centroids = train[rng.choice(train.shape[0], size=nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assign = IVFIndex.assign(train, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, train)
+            counts = np.bincount(assign, minlength=nlist)
+            empty = counts == 0
+            if empty.any():
+                sums[empty] = train[rng.choice(train.shape[0], size=int(empty.sum()))]
+            centroids = normalize_rows(sums)
+        return centroids
+
+    @staticmethod
+    def assign(vectors, centroids, block_rows=65536):
+        out = np.empty(vectors.shape[0], dtype=np.int64)
+        for start in range(0, vectors.shape[0], block_rows):
+            block = np.asarray(vectors[start:start + block_rows])
+            out[start:start + block_rows] = np.argmax(block @ centroids.T, axis=1)
+        return out
+
+    #Devolve o índice e a permutação aplicada às linhas (para reordenar ids/documentos)
+    @classmethod
+    def build(cls, vectors, nlist=None, nprobe=8, iterations=10, seed=0):
+        vectors = normalize_rows(vectors)
+        nlist = nlist or max(1, int(np.sqrt(vectors.shape[0])))
+        nlist = min(nlist, vectors.shape[0])
+        centroids = cls.train(vectors, nlist, iterations=iterations, seed=seed)
+        assign = cls.assign(vectors, centroids)
+        order = np.argsort(assign, kind="stable")
+        list_offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=nlist))])
+        return cls(vectors[order], centroids, list_offsets, nprobe=nprobe), order
+
+    def search(self, queries, k=8, nprobe=None, exact=False):
+        if exact:
+            return self.search_exact(queries, k)
+        queries = normalize_rows(queries)
+        nprobe = min(nprobe or self.nprobe, self.centroids.shape[0])
+        _, probes = top_k(queries @ self.centroids.T, nprobe)
+
+        all_scores = np.full((queries.shape[0], k), -np.inf, dtype=np.float32)
+        all_rows = np.full((queries.shape[0], k), -1, dtype=np.int64)
+        for qi in range(queries.shape[0]):
+            #Cada lista é uma fatia contígua: produto direto na fatia, sem copiar linhas
+            spans = [(self.list_offsets[c], self.list_offsets[c + 1]) for c in probes[qi]]
+            spans = [(a, b) for a, b in spans if b > a]
+            if not spans:
+                continue
+            candidates = np.concatenate([self.block_scores(a, b, queries[qi:qi + 1])[0] for a, b in spans])
+            rows = np.concatenate([np.arange(a, b) for a, b in spans])
+            scores, pos = top_k(candidates, k)
+            all_scores[qi, :scores.size] = scores
+            all_rows[qi, :scores.size] = rows[pos]
+        return all_scores, all_rows
+
+
+#Uma coleção em disco: vectors.npy (aberto por memory-map), centroids/list_offsets
+#do IVF quando existem e meta.json com ids, documentos e metadados na mesma ordem.
+#Com dim/dtype o índice guarda vetores truncados (Matryoshka) e/ou quantizados; com
+#keep_full os vetores originais em float32 ficam em full.npy para reordenar os melhores
+#candidatos com precisão total. Com chunk_store (chunkStore.py) os textos não vão para o
+#meta.json: só os k resultados de cada busca são lidos do armazém. A impressão digital do
+#armazém fica no meta.json, e a coleção não abre se ele foi reconstruído depois dela
+class LocalCollection():
+    def __init__(self, path, index, ids, documents, metadatas, generation=0, full=None, rescore=0,
+                 chunk_store=None):
+        self.path = path
+        self.index = index
+        self.ids = ids
+        self.documents = documents
+        self.metadatas = metadatas
+        self.generation = generation
+        self.full = full
+        self.rescore = rescore
+        self.chunk_store = chunk_store
+
+    @classmethod
+    def create(cls, path, vectors, documents, ids=None, metadatas=None, nlist=0, nprobe=8, generation=0,
+               dim=None, dtype="float32", keep_full=False, rescore=4, chunk_store=None):
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        ids = list(ids) if ids is not None else [str(i) for i in range(len(documents))]
+        metadatas = list(metadatas) if metadatas is not None else [{} for _ in ids]
+        documents = list(documents) if chunk_store is None else [None] * len(ids)
+        fingerprint = None
+        if chunk_store is not None:
+            store = ChunkStore(chunk_store)
+            fingerprint = store.fingerprint
+            store.close()
+            if fingerprint["chunks"] != len(ids):
+                raise ValueError(f"chunk store com {fingerprint['chunks']} chunks para {len(ids)} vetores")
+        full = normalize_rows(vectors)
+        search_vectors = matryoshka(full, dim) if dim else full
+
+        if nlist and len(documents) > nlist:
+            index, order = IVFIndex.build(search_vectors, nlist=nlist, nprobe=nprobe)
+            full = full[order]
+            order = order.tolist()
+            ids = [ids[i] for i in order]
+            documents = [documents[i] for i in order]
+            metadatas = [metadatas[i] for i in order]
+            np.save(path / "centroids.npy", index.centroids)
+            np.save(path / "list_offsets.npy", index.list_offsets)
+        else:
+            index = FlatIndex(search_vectors)
+            for name in ("centroids.npy", "list_offsets.npy"):
+                if (path / name).exists():
+                    (path / name).unlink()
+
+        data, scales = quantize(index.vectors, dtype)
+        np.save(path / "vectors.npy", data)
+        for name, array in (("scales.npy", scales), ("full.npy", full if keep_full else None)):
+            if array is not None:
+                np.save(path / name, array)
+            elif (path / name).exists():
+                (path / name).unlink()
+        meta = {"ids": ids, "documents": documents if chunk_store is None else None,
+                "chunk_store": Path(chunk_store).resolve().as_posix() if chunk_store is not None else None,
+                "chunk_store_fingerprint": fingerprint,
+                "metadatas": metadatas,
+                "nprobe": nprobe, "generation": generation, "dim": int(search_vectors.shape[1]),
+                "dtype": dtype, "rescore": rescore if keep_full else 0}
+        tmp = path / "meta.json.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp, path / "meta.json")
+        return cls.open(path)
+
+    @classmethod
+    def open(cls, path, mmap=True):
+        path = Path(path)
+        with open(path / "meta.json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        mode = "r" if mmap else None
+        vectors = np.load(path / "vectors.npy", mmap_mode=mode)
+        scales = np.load(path / "scales.npy") if (path / "scales.npy").exists() else None
+        full = np.load(path / "full.npy", mmap_mode=mode) if (path / "full.npy").exists() else None
+        if (path / "centroids.npy").exists():
+            index = IVFIndex(vectors, np.load(path / "centroids.npy"), np.load(path / "list_offsets.npy"),
+                             nprobe=meta.get("nprobe", 8), scales=scales)
+        else:
+            index = FlatIndex(vectors, scales=scales)
+        chunk_store = ChunkStore(meta["chunk_store"]) if meta.get("chunk_store") else None
+        if chunk_store is not None and chunk_store.fingerprint != meta.get("chunk_store_fingerprint"):
+            chunk_store.close()
+            raise ValueError(f"chunk store {meta['chunk_store']} mudou depois da criação da coleção "
+                             f"{path.name}; recrie a coleção")
+        return cls(path, index, meta["ids"], meta["documents"], meta["metadatas"], meta.get("generation", 0),
+                   full=full, rescore=meta.get("rescore", 0), chunk_store=chunk_store)
+
+    #Bytes do índice usado na busca (vetores + escalas), sem o full.npy
+    def index_nbytes(self):
+        size = self.index.vectors.nbytes
+        return size + (self.index.scales.nbytes if self.index.scales is not None else 0)
+
+    def documents_at(self, rows):
+        if self.chunk_store is not None:
+            return self.chunk_store.texts([self.ids[r] for r in rows])
+        return [self.documents[r] for r in rows]
+
+    #As perguntas podem vir com a dimensão original: o truncamento é feito aqui. rescore=0
+    #desliga a reordenação em float32 mesmo quando full.npy existe
+    def query(self, queries, k=8, rescore=None, **kwargs):
+        queries = normalize_rows(np.asarray(queries, dtype=np.float32))
+        search_queries = matryoshka(queries, self.index.dim) if queries.shape[1] != self.index.dim else queries
+        factor = self.rescore if rescore is None else rescore
+        can_rescore = factor and self.full is not None and queries.shape[1] == self.full.shape[1]
+
+        if can_rescore:
+            _, candidates = self.index.search(search_queries, k=k * factor, **kwargs)
+            scores = np.full((queries.shape[0], k), -np.inf, dtype=np.float32)
+            rows = np.full((queries.shape[0], k), -1, dtype=np.int64)
+            for qi in range(queries.shape[0]):
+                cand = candidates[qi][candidates[qi] >= 0]
+                if cand.size == 0:
+                    continue
+                order = np.sort(cand)
+                exact = np.asarray(self.full[order]) @ queries[qi]
+                best, pos = top_k(exact, k)
+                scores[qi, :best.size] = best
+                rows[qi, :best.size] = order[pos]
+        else:
+            scores, rows = self.index.search(search_queries, k=k, **kwargs)
+
+        result = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for q_scores, q_rows in zip(scores, rows):
+            keep = [(float(s), int(r)) for s, r in zip(q_scores, q_rows) if r >= 0]
+            result["ids"].append([self.ids[r] for _, r in keep])
+            result["documents"].append(self.documents_at([r for _, r in keep]))
+            result["metadatas"].append([self.metadatas[r] for _, r in keep])
+            result["distances"].append([1.0 - s for s, _ in keep])
+        return result
+
+
+#Substituto local do VectorStore usado pelo RagGenerate: uma pasta por coleção em
+#VECTOR_INDEX_DIR e o mesmo formato de resposta ({'documents': [[...]], ...})
+class LocalVectorStore():
+    def __init__(self, base_dir=None):
+        self.base_dir = Path(base_dir or os.getenv("VECTOR_INDEX_DIR", ".cache/indexes"))
+        self._collections = {}
+        self._stamps = {}
+
+    def collection_path(self, collection_name):
+        return self.base_dir / collection_name
+
+    #Reabre a coleção quando o meta.json mudou (re-indexação por outro processo)
+    def get_collection(self, collection_name):
+        meta_path = self.collection_path(collection_name) / "meta.json"
+        stamp = meta_path.stat().st_mtime_ns
+        cached = self._collections.get(collection_name)
+        if cached is None or self._stamps.get(collection_name) != stamp:
+            self._collections[collection_name] = LocalCollection.open(self.collection_path(collection_name))
+            self._stamps[collection_name] = stamp
+        return self._collections[collection_name]
+
+    #Geração da coleção: muda a cada create_collection, então serve de chave de invalidação
+    def collection_version(self, collection_name):
+        return self.get_collection(collection_name).generation
+
+    def create_collection(self, collection_name, vectors, documents, ids=None, metadatas=None, nlist=0, nprobe=8,
+                          dim=None, dtype="float32", keep_full=False, rescore=4, chunk_store=None):
+        self._collections.pop(collection_name, None)
+        self._stamps.pop(collection_name, None)
+        generation = 0
+        meta_path = self.collection_path(collection_name) / "meta.json"
+        # Lê só o meta.json: a coleção antiga pode não abrir mais (chunk store reconstruído)
+        if meta_path.exists():
+            with open(meta_path, "r", encoding="utf-8") as f:
+                generation = json.load(f).get("generation", 0) + 1
+        collection = LocalCollection.create(
+            self.collection_path(collection_name), vectors, documents, ids=ids, metadatas=metadatas,
+            nlist=nlist, nprobe=nprobe, generation=generation, dim=dim, dtype=dtype, keep_full=keep_full,
+            rescore=rescore, chunk_store=chunk_store,
+        )
+        self._collections[collection_name] = collection
+        self._stamps[collection_name] = (collection.path / "meta.json").stat().st_mtime_ns
+        return collection
+
+    def collection_query(self, query, collection_name, k=8, **kwargs):
+        return self.get_collection(collection_name).query(query, k=k, **kwargs)
+
+
+def main():
+    from embedGenerate import EmbedGenerate
+
+    parser = argparse.ArgumentParser(description="Indexa um JSONL do extractorPDF em uma coleção local.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--jsonl", help="Arquivo JSONL gerado pelo extractorPDF.py.")
+    source.add_argument("--chunk-store", help="Chunk store (chunkStore.py); os textos ficam só nele.")
+    parser.add_argument("--collection", required=True, help="Nome da coleção.")
+    parser.add_argument("--nlist", type=int, default=0, help="Listas do IVF (0 = só busca exata).")
+    parser.add_argument("--nprobe", type=int, default=8, help="Listas visitadas por busca no IVF.")
+    parser.add_argument("--dim", type=int, default=0, help="Dimensão Matryoshka do índice (0 = original).")
+    parser.add_argument("--dtype", default="float32", choices=["float32", "float16", "int8"])
+    parser.add_argument("--keep-full", action="store_true", help="Guarda os vetores em float32 para reordenar os candidatos.")
+    args = parser.parse_args()
+
+    if args.jsonl:
+        with open(args.jsonl, "r", encoding="utf-8") as f:
+            records = [json.loads(line) for line in f if line.strip()]
+    else:
+        records = [r.to_dict() for r in ChunkStore(args.chunk_store)]
+
+    documents = [r["text"] for r in records]
+    ids = [f"{r['doc_id']}:{r['chunk_index']}" for r in records]
+    metadatas = [{k: r[k] for k in ("doc_id", "source_path", "page_from", "page_to", "chunk_index")} for r in records]
+    vectors = EmbedGenerate().embed_texts(documents, task_type='search_document')
+
+    store = LocalVectorStore()
+    collection = store.create_collection(args.collection, vectors, documents, ids=ids, metadatas=metadatas,
+                                         nlist=args.nlist, nprobe=args.nprobe, dim=args.dim or None,
+                                         dtype=args.dtype, keep_full=args.keep_full, chunk_store=args.chunk_store)
+    print(f"Coleção {args.collection}: {len(collection.ids)} chunks em {collection.path.as_posix()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import numpy as np
+
+#Redução do custo dos vetores: truncamento Matryoshka (nomic-embed-text-v1.5 foi treinado
+#para que os primeiros 512/256/128 componentes já funcionem sozinhos) e armazenamento em
+#float16 ou int8 com uma escala por vetor
+
+DTYPES = ("float32", "float16", "int8")
+
+
+#Mesmo procedimento indicado para o nomic v1.5: layer norm no vetor inteiro, corta em dim
+#e normaliza de novo (cosseno = produto escalar)
+def matryoshka(vectors, dim, layer_norm=True):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    single = vectors.ndim == 1
+    if single:
+        vectors = vectors[None, :]
+    if dim and dim < vectors.shape[1]:
+        if layer_norm:
+            mean = vectors.mean(axis=1, keepdims=True)
+            std = vectors.std(axis=1, keepdims=True)
+            vectors = (vectors - mean) / np.maximum(std, 1e-6)
+        vectors = vectors[:, :dim]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    vectors = np.ascontiguousarray(vectors / norms, dtype=np.float32)
+    return vectors[0] if single else vectors
+
+
+#Devolve (dados, escalas); escalas só existem no int8: x ≈ q * escala, q em [-127, 127]
+def quantize(vectors, dtype="float32"):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if dtype == "float32":
+        return vectors, None
+    if dtype == "float16":
+        return vectors.astype(np.float16), None
+    if dtype == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        q = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return q, scales.astype(np.float32)
+    raise ValueError(f"tipo de vetor desconhecido: {dtype}")
+
+
+def dequantize(data, scales=None):
+    out = np.asarray(data).astype(np.float32)
+    if scales is not None:
+        out *= np.asarray(scales, dtype=np.float32)[:, None]
+    return out
@@ -1,41 +1,143 @@
-from pymongo import MongoClient
+import argparse
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from embedGenerate import EmbedGenerate
+from mongoClient import GENERATIONS_COLLECTION, get_mongo_client
 
 load_dotenv()
 
-mongo_client = MongoClient(os.getenv("MONGO_ADDRESS"))
-db_access = mongo_client[os.getenv("MONGO_DB")]
-collection_access = db_access[os.getenv("MONGO_COLLECTION")]
-embedding = EmbedGenerate()
-
-prompt = input('Digite a frase para busca: ')
-query = embedding.embed_query(prompt)
-
-collection_access.create_index(
-    [('vector', 'vector')],
-    name='vector-search-index',
-    extra={'vectorIndexType': 'hnsw', 'vectorIndexParams': {'dim': 768, 'similarity': 'cosine'}}
-)
-
-search = db_access.command({
-    'aggregate': 'vector-store',
-    'pipeline': [
-        {
-            "$vectorSearch": {
-                "queryVector": query,
-                "path": "vector",
-                "numCandidates": 15,
-                "limit": 8,
-                "index": "vector-search-index"
-                }
-        },
-        {"$project": {"_id": 0, "texto": 1, "score": {"$meta": "vectorSearchScore"}}}
-    ],
-    'cursor': {}
-})
-
-
-print(f"\nInput -> {prompt}")
-print(f"\nDocumentos semelhantes:\n{search}")
\ No newline at end of file
+#Serviço de busca vetorial no MongoDB: o índice é verificado/criado uma vez por
+#processo e o cliente fica aberto (pool compartilhado de mongoClient.py)
+class VectorSearchService():
+    _indexed = set()
+    _indexed_lock = threading.Lock()
+
+    #collection permite usar uma coleção já aberta em vez da configurada no .env
+    #dim acompanha EMBED_DIM (vetores truncados pelo EmbedGenerate)
+    def __init__(self, collection=None, index_name=None, dim=None, similarity='cosine',
+                 text_field='chunk', candidate_factor=10, max_workers=4):
+        if collection is None:
+            db_access = get_mongo_client()[os.getenv("MONGO_DB")]
+            collection = db_access[os.getenv("MONGO_COLLECTION")]
+        self.collection_access = collection
+        self.dim = dim or int(os.getenv("EMBED_DIM", "0")) or 768
+        #Um índice por dimensão: trocar EMBED_DIM não reaproveita um índice com outra dimensão
+        self.index_name = index_name or ('vector-search-index' if self.dim == 768 else f'vector-search-index-{self.dim}')
+        self.similarity = similarity
+        self.text_field = text_field
+        #numCandidates padrão = k * candidate_factor: mais candidatos, mais recall e mais latência
+        self.candidate_factor = candidate_factor
+        self.max_workers = max_workers
+
+    def ensure_index(self):
+        key = (self.collection_access.full_name, self.index_name)
+        with VectorSearchService._indexed_lock:
+            if key in VectorSearchService._indexed:
+                return
+            existing = {index['name'] for index in self.collection_access.list_indexes()}
+            if self.index_name not in existing:
+                self.collection_access.create_index(
+                    [('vector', 'vector')],
+                    name=self.index_name,
+                    extra={'vectorIndexType': 'hnsw', 'vectorIndexParams': {'dim': self.dim, 'similarity': self.similarity}}
+                )
+            #Campos usados nos pré-filtros precisam de índice comum
+            if 'doc_id_1' not in existing:
+                self.collection_access.create_index([('doc_id', 1)])
+            if 'page_from_1_page_to_1' not in existing:
+                self.collection_access.create_index([('page_from', 1), ('page_to', 1)])
+            VectorSearchService._indexed.add(key)
+
+    #Pré-filtro aplicado antes da etapa ANN: doc_id (um ou vários) e/ou faixa de páginas
+    #(mantém os chunks que se sobrepõem a [page_from, page_to])
+    @staticmethod
+    def build_filter(doc_id=None, page_from=None, page_to=None):
+        clauses = []
+        if doc_id is not None:
+            if isinstance(doc_id, (list, tuple, set)):
+                clauses.append({'doc_id': {'$in': list(doc_id)}})
+            else:
+                clauses.append({'doc_id': {'$eq': doc_id}})
+        if page_from is not None:
+            clauses.append({'page_to': {'$gte': page_from}})
+        if page_to is not None:
+            clauses.append({'page_from': {'$lte': page_to}})
+        if not clauses:
+            return None
+        return clauses[0] if len(clauses) == 1 else {'$and': clauses}
+
+    def build_pipeline(self, query_vector, k=8, num_candidates=None, doc_id=None, page_from=None, page_to=None):
+        stage = {
+            "queryVector": list(query_vector),
+            "path": "vector",
+            "numCandidates": max(k, num_candidates or k * self.candidate_factor),
+            "limit": k,
+            "index": self.index_name,
+        }
+        prefilter = self.build_filter(doc_id, page_from, page_to)
+        if prefilter is not None:
+            stage["filter"] = prefilter
+        return [
+            {"$vectorSearch": stage},
+            {"$project": {self.text_field: 1, "doc_id": 1, "source_path": 1, "page_from": 1, "page_to": 1,
+                          "chunk_index": 1, "score": {"$meta": "vectorSearchScore"}}}
+        ]
+
+    def search(self, query_vector, k=8, num_candidates=None, doc_id=None, page_from=None, page_to=None):
+        self.ensure_index()
+        pipeline = self.build_pipeline(query_vector, k, num_candidates, doc_id, page_from, page_to)
+        return list(self.collection_access.aggregate(pipeline))
+
+    #Várias perguntas em paralelo no mesmo pool de conexões; resultados na ordem da entrada
+    def search_many(self, query_vectors, k=8, num_candidates=None, **filters):
+        query_vectors = list(query_vectors)
+        if len(query_vectors) <= 1:
+            return [self.search(q, k, num_candidates, **filters) for q in query_vectors]
+        self.ensure_index()
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(query_vectors))) as executor:
+            return list(executor.map(lambda q: self.search(q, k, num_candidates, **filters), query_vectors))
+
+    #Geração gravada pelo VectorStoreMongo a cada ingestão (0 se nunca houve)
+    def collection_version(self, collection_name=None):
+        doc = self.collection_access.database[GENERATIONS_COLLECTION].find_one({'_id': self.collection_access.name})
+        return doc['generation'] if doc else 0
+
+    #Mesma interface do LocalVectorStore, para ser usado pelo RagGenerate. A coleção é a
+    #do serviço; collection_name fica só por compatibilidade
+    def collection_query(self, query, collection_name=None, k=8, **kwargs):
+        result = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for hits in self.search_many(query, k=k, **kwargs):
+            result["ids"].append([str(h.get('_id')) for h in hits])
+            result["documents"].append([h.get(self.text_field) for h in hits])
+            result["metadatas"].append([{key: h.get(key) for key in ("doc_id", "source_path", "page_from", "page_to", "chunk_index")}
+                                        for h in hits])
+            result["distances"].append([1.0 - h.get('score', 0.0) for h in hits])
+        return result
+
+
+def main():
+    from embedGenerate import EmbedGenerate
+
+    parser = argparse.ArgumentParser(description="Busca vetorial no MongoDB.")
+    parser.add_argument("--k", type=int, default=8, help="Quantidade de chunks devolvidos.")
+    parser.add_argument("--num-candidates", type=int, default=None, help="Candidatos avaliados pelo ANN (padrão: 10 * k).")
+    parser.add_argument("--doc-id", default=None, help="Restringe a busca a um documento.")
+    parser.add_argument("--page-from", type=int, default=None)
+    parser.add_argument("--page-to", type=int, default=None)
+    args = parser.parse_args()
+
+    service = VectorSearchService()
+    embedding = EmbedGenerate()
+
+    prompt = input('Digite a frase para busca: ')
+    query = embedding.embed_query(prompt)[0]
+    search = service.search(query, k=args.k, num_candidates=args.num_candidates,
+                            doc_id=args.doc_id, page_from=args.page_from, page_to=args.page_to)
+
+    print(f"\nInput -> {prompt}")
+    print(f"\nDocumentos semelhantes:\n{search}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,40 +1,163 @@
+import json
+import time
 from embedGenerate import EmbedGenerate
 from chunkGenerate import ChunkGenerate
-from pymongo import MongoClient
-from pymongo.server_api import ServerApi
+from chunkRecord import ChunkRecord
+from extractorPDF import file_sha1
+from mongoClient import GENERATIONS_COLLECTION, get_mongo_client
+from itertools import islice
+from pymongo import UpdateOne
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
 class VectorStoreMongo():
-    def __init__(self):
-        self.mongo_client = MongoClient(os.getenv("MONGO_ADDRESS"), server_api=ServerApi('1'))
-        self.db_access = self.mongo_client[os.getenv("MONGO_DB")]
-        self.collection_access = self.db_access[os.getenv("MONGO_COLLECTION")]
-        self.embedding = EmbedGenerate()
-        self.chunking = ChunkGenerate()
+    #collection permite usar uma coleção já aberta (ex.: mongomock) em vez da configurada no .env
+    def __init__(self, collection=None, embedding=None, chunking=None):
+        if collection is None:
+            self.mongo_client = get_mongo_client()
+            self.db_access = self.mongo_client[os.getenv("MONGO_DB")]
+            self.collection_access = self.db_access[os.getenv("MONGO_COLLECTION")]
+        else:
+            self.collection_access = collection
+            self.db_access = collection.database
+            self.mongo_client = self.db_access.client
+        self.embedding = embedding if embedding is not None else EmbedGenerate()
+        self.chunking = chunking if chunking is not None else ChunkGenerate()
+        self.last_stats = {}
 
-    def insert_single(self):
-        chunk_collection = self.chunking.create_dinamic_chunk()
-        embed_collection = self.embedding.embed_text()
+    #_id derivado do conteúdo: reinserir o mesmo chunk sobrescreve em vez de duplicar,
+    #e chunks de PDFs diferentes nunca colidem
+    @staticmethod
+    def chunk_id(doc_id, chunk_index):
+        return f"{doc_id}:{chunk_index}"
+
+    @staticmethod
+    def to_document(record, vector):
+        return {
+            'vector': vector,
+            'chunk': record.text,
+            'doc_id': record.doc_id,
+            'source_path': record.source_path,
+            'page_from': record.page_from,
+            'page_to': record.page_to,
+            'chunk_index': record.chunk_index,
+        }
+
+    #Chunks do ChunkGenerate viram ChunkRecords do PDF de origem (sem página conhecida: 0)
+    def chunker_records(self):
+        pdf_path = self.chunking.extractor.pdf_path
+        doc_id = file_sha1(pdf_path)
+        return [
+            ChunkRecord(doc_id=doc_id, source_path=pdf_path.as_posix(), page_from=0, page_to=0,
+                        chunk_index=i, text=chunk)
+            for i, chunk in enumerate(self.chunking.create_dinamic_chunk())
+        ]
+
+    #Upsert em lotes com bulk_write (ordered=False deixa o servidor aplicar o lote em paralelo
+    #e seguir adiante em caso de erro em um documento)
+    def upsert_records(self, records, vectors, batch_size=500, ordered=False):
+        stats = {'docs': 0, 'batches': 0, 'upserted': 0, 'modified': 0, 'matched': 0, 'seconds': 0.0}
+        started = time.perf_counter()
+        ops = []
+
+        def flush():
+            result = self.collection_access.bulk_write(ops, ordered=ordered)
+            stats['batches'] += 1
+            stats['docs'] += len(ops)
+            stats['upserted'] += result.upserted_count
+            stats['modified'] += result.modified_count
+            stats['matched'] += result.matched_count
+            ops.clear()
+
+        for record, vector in zip(records, vectors):
+            ops.append(UpdateOne(
+                {'_id': self.chunk_id(record.doc_id, record.chunk_index)},
+                {'$set': self.to_document(record, vector)},
+                upsert=True,
+            ))
+            if len(ops) >= batch_size:
+                flush()
+        if ops:
+            flush()
 
-        for i in range(len(chunk_collection)):
-            new_object = {
-                '_id': i,
-                'vector': embed_collection[i],
-                'chunk': chunk_collection[i]
-            }
+        if stats['docs']:
+            self.bump_generation()
+        stats['seconds'] = time.perf_counter() - started
+        stats['docs_per_s'] = stats['docs'] / stats['seconds'] if stats['seconds'] > 0 else 0.0
+        self.last_stats = stats
+        return stats
 
-            self.collection_access.insert_one(new_object)
+    #Ingestão do JSONL do extractorPDF: lê, embeda e grava um lote por vez, sem carregar o arquivo todo
+    def insert_jsonl(self, jsonl_path, batch_size=500, ordered=False):
+        totals = {'docs': 0, 'batches': 0, 'upserted': 0, 'modified': 0, 'matched': 0, 'seconds': 0.0}
+        counts, sources = {}, {}
+        with open(jsonl_path, "r", encoding="utf-8") as f:
+            records = (ChunkRecord.from_dict(json.loads(line)) for line in f if line.strip())
+            while True:
+                batch = list(islice(records, batch_size))
+                if not batch:
+                    break
+                for r in batch:
+                    counts[r.doc_id] = max(counts.get(r.doc_id, 0), r.chunk_index + 1)
+                    sources[r.source_path] = r.doc_id
+                vectors = self.embedding.embed_texts([r.text for r in batch])
+                stats = self.upsert_records(batch, vectors, batch_size=batch_size, ordered=ordered)
+                for key in totals:
+                    totals[key] += stats[key]
 
-    def insert_several(self):
-        chunk_collection = self.chunking.create_dinamic_chunk()
-        embed_collection = self.embedding.embed_text()
+        totals['pruned'] = self.prune_chunks(counts, sources)
+        totals['docs_per_s'] = totals['docs'] / totals['seconds'] if totals['seconds'] > 0 else 0.0
+        self.last_stats = totals
+        return totals
 
-        self.collection_access.insert_many(
-            {'_id': i, 'vector': embed_collection[i], 'chunk': chunk_collection[i]} for i in range(len(chunk_collection))
+    #Um PDF rechunkeado com menos chunks deixaria os chunk_index antigos acima do novo total;
+    #counts = {doc_id: nº de chunks da ingestão atual}. Um PDF cujo conteúdo mudou ganha outro
+    #doc_id (SHA-1) e os chunks do conteúdo anterior ficariam todos; sources = {source_path:
+    #doc_id atual} apaga os chunks do mesmo arquivo com outro doc_id. Devolve quantos foram apagados
+    def prune_chunks(self, counts, sources=None):
+        deleted = 0
+        for doc_id, count in counts.items():
+            result = self.collection_access.delete_many({'doc_id': doc_id, 'chunk_index': {'$gte': count}})
+            deleted += result.deleted_count
+        for source_path, doc_id in (sources or {}).items():
+            result = self.collection_access.delete_many({'source_path': source_path, 'doc_id': {'$ne': doc_id}})
+            deleted += result.deleted_count
+        if deleted:
+            self.bump_generation()
+        return deleted
+
+    #Contador de ingestão da coleção (em GENERATIONS_COLLECTION); caches de busca usam
+    #esse número para nunca servir contexto anterior a uma re-ingestão
+    def bump_generation(self):
+        self.db_access[GENERATIONS_COLLECTION].update_one(
+            {'_id': self.collection_access.name}, {'$inc': {'generation': 1}}, upsert=True
+        )
+
+    def insert_single(self):
+        records = self.chunker_records()
+        embed_collection = self.embedding.embed_texts([r.text for r in records])
+
+        for record, vector in zip(records, embed_collection):
+            self.collection_access.replace_one(
+                {'_id': self.chunk_id(record.doc_id, record.chunk_index)},
+                self.to_document(record, vector),
+                upsert=True,
             )
+        self.bump_generation()
+        if records:
+            self.prune_chunks({records[0].doc_id: len(records)}, {records[0].source_path: records[0].doc_id})
+
+    def insert_several(self, batch_size=500):
+        records = self.chunker_records()
+        embed_collection = self.embedding.iter_embeddings(r.text for r in records)
+
+        stats = self.upsert_records(records, embed_collection, batch_size=batch_size)
+        if records:
+            stats['pruned'] = self.prune_chunks({records[0].doc_id: len(records)},
+                                                {records[0].source_path: records[0].doc_id})
+        return stats
 
     def ping(self):
         self.mongo_client.admin.command('ping')
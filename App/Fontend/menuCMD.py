@@ -4,6 +4,9 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from Backend.ragGenerate import RagGenerate
 from Backend.instructions import Instructions
+from Backend.streaming import StreamTiming, timed_stream
+from Backend.promptBuilder import PromptBuilder
+from Backend.chatHistory import CompactChat
 from google import genai
 from google.genai import types
 from dotenv import load_dotenv
@@ -11,15 +14,18 @@ from dotenv import load_dotenv
 load_dotenv()
 
 class MenuBackend():
-    def __init__(self):
+    #stream=True imprime a resposta do tutor à medida que é gerada
+    def __init__(self, stream=True):
+        self.stream = stream
         self.client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
         self.client.chats.create
-        self.chat = self.client.chats.create(model="gemma-3-27b-it", 
-                                             config= types.GenerateContentConfig(
-                                                 temperature=0.1,
-                                                 top_p=1,
-                                                 max_output_tokens=10,
-                                                 top_k=20))
+        #Janela de CHAT_HISTORY_WINDOW trocas + resumo das anteriores
+        self.chat = CompactChat(self.client, model="gemma-3-27b-it", 
+                                config= types.GenerateContentConfig(
+                                    temperature=0.1,
+                                    top_p=1,
+                                    max_output_tokens=10,
+                                    top_k=20))
         self.recovery = RagGenerate()
         self.instructions = Instructions()
         self.collection_name = "Chunk_Dinamic_NoOverlap"
@@ -76,6 +82,9 @@ class MenuBackend():
             instruction = self.instructions.get_instructions("02")
             print("\n*****Tutor virtual sem a utilização de RAG, se quiser sair é só digitar ""sair"" a qualquer momento*****")
         
+        #Persona e instrução vão no cabeçalho fixo do chat; o prompt de cada turno só leva contexto e pergunta
+        self.chat.system_text = persona + "\n" + instruction
+        prompts = PromptBuilder("")
         i = 0
 
         while True:
@@ -85,41 +94,56 @@ class MenuBackend():
             if question == "sair":
                 self.get_menu()
                 break
+
+            timing = StreamTiming()
             
             if opt != "4":
 
                 relevant_docs = self.recovery.compair_vector(question, self.collection_name)
 
-                context_text = ""
+                documents = []
                 if 'documents' in relevant_docs and relevant_docs['documents']:
                     for doc_list in relevant_docs['documents']:
-                        for doc in doc_list:
-                            context_text += f"{doc}\n\n"
-
-                full_prompt = f"""{persona}
-                    {instruction}
-                    Responda com base nas seguintes informações:
-                    {context_text} 
-                    Se as informações não tiverem relação com a pergunta a seguir, desconsidere o uso delas.
-                    Pergunta: {question}
-                    """
+                        documents.extend(doc_list)
+
+                full_prompt = prompts.build(question, documents)
+                context_text = "\n\n".join(prompts.last_context)
                 
                 print("***********************************")
                 print(f"\nContexto Extraido: {context_text}")
                 
-                response = self.chat.send_message(full_prompt)
-
-                print(f"\n[Tutor]:\n{response.text}")
+                self.reply(full_prompt, f"Pergunta: {question}", timing)
+                prompts.mark_sent()
+                self.print_prompt_stats(dict(prompts.last_stats, **self.chat.last_stats))
                 i += 2
 
             else:
-                full_prompt = f"""{persona}
-                    {instruction}
-                    Pergunta: {question}
-                    """
-                
-                response = self.chat.send_message(full_prompt)
+                full_prompt = prompts.build(question)
 
-                print(f"\n[Tutor]:\n{response.text}")
+                self.reply(full_prompt, f"Pergunta: {question}", timing)
+                prompts.mark_sent()
+                self.print_prompt_stats(dict(prompts.last_stats, **self.chat.last_stats))
                 i += 2
-    
\ No newline at end of file
+
+    #Imprime a resposta (em streaming ou inteira) e os tempos desde a pergunta: até o
+    #primeiro token e total
+    def reply(self, full_prompt, history_text, timing):
+        print("\n[Tutor]:")
+        if self.stream:
+            for text in timed_stream(self.chat.send_message_stream(full_prompt, history_text), timing):
+                print(text, end="", flush=True)
+            print()
+        else:
+            for text in timed_stream([self.chat.send_message(full_prompt, history_text)], timing):
+                print(text)
+        info = timing.info()
+        #Resposta vazia/bloqueada não tem primeiro token
+        ttft = f"{info['ttft_ms']:.0f} ms" if info['ttft_ms'] is not None else "-"
+        total = f"{info['total_ms']:.0f} ms" if info['total_ms'] is not None else "-"
+        print(f"(primeiro token: {ttft}, total: {total})")
+
+    def print_prompt_stats(self, stats):
+        print(f"(requisição: {stats['request_tokens']} tokens, {stats['history_turns']} turnos no histórico; "
+              f"prompt do turno: {stats['prompt_tokens']} tokens -> "
+              f"contexto {stats['context_tokens']} em {stats['chunks_used']}/{stats['chunks_in']} chunks, "
+              f"pergunta {stats['question_tokens']})")